@@ -1,10 +1,13 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, EmailStr
 import sqlite3
 import os
-from datetime import datetime
+
+from ratelimit import RateLimiter, route_limits, retry_after, client_ip
 
 app = FastAPI(title="SmartNRI API")
+limiter = RateLimiter(route_limits())
 
 DB_PATH = os.getenv("DB_PATH", "data/smartnri.db")
 
@@ -44,6 +47,27 @@ def init_db():
 # Initialize DB on startup
 init_db()
 
+def too_many_requests(wait: float):
+    return JSONResponse(
+        status_code=429,
+        content={"status": "error", "message": "Too many requests — please try again later"},
+        headers={"Retry-After": retry_after(wait)},
+    )
+
+@app.middleware("http")
+async def limit_by_ip(request: Request, call_next):
+    # Rejected before the body is read or the database is touched
+    wait = limiter.hit(request.url.path, "ip", client_ip(request))
+    if wait:
+        return too_many_requests(wait)
+    return await call_next(request)
+
+def limit_by_email(route: str, email: str):
+    wait = limiter.hit(route, "email", email.lower())
+    if wait:
+        raise HTTPException(status_code=429, detail="Too many requests for this email",
+                            headers={"Retry-After": retry_after(wait)})
+
 class UserRegister(BaseModel):
     name: str
     email: EmailStr
@@ -56,6 +80,7 @@ class BugReport(BaseModel):
 
 @app.post("/api/register")
 def register_user(user: UserRegister):
+    limit_by_email("/api/register", user.email)
     try:
         conn = get_db()
         c = conn.cursor()
@@ -74,6 +99,7 @@ def register_user(user: UserRegister):
 
 @app.post("/api/report-bug")
 def report_bug(report: BugReport):
+    limit_by_email("/api/report-bug", report.email)
     try:
         conn = get_db()
         c = conn.cursor()
@@ -0,0 +1,91 @@
+"""
+ratelimit.py — SmartNRI API Rate Limiter
+In-memory token buckets keyed by client IP and by email, checked before any database work.
+
+Rules:
+- Limits are per route and per key type, written "N/period" (e.g. "10/minute"), set in
+  ROUTE_LIMITS and overridable with RATE_LIMIT_<ROUTE>_<KEY>, e.g. RATE_LIMIT_REGISTER_IP=20/minute
+- Client IP comes from nginx's X-Real-IP header (falls back to the socket peer)
+- A rejected request costs one dict lookup: 429 with Retry-After, no DB access
+- Memory is bounded: at most RATE_LIMIT_MAX_KEYS buckets, least recently used evicted first
+- State is per process — run the API with one worker, or limits apply per worker
+"""
+
+import os
+import math
+import time
+import threading
+from collections import OrderedDict
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# route → key type → "N/period"
+ROUTE_LIMITS = {
+    "/api/register":   {"ip": "10/minute", "email": "3/hour"},
+    "/api/report-bug": {"ip": "5/minute",  "email": "10/hour"},
+}
+
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS") or "50000")
+
+
+def parse_limit(spec: str) -> tuple[float, float]:
+    """'10/minute' → (capacity 10, refill 10/60 tokens per second)."""
+    count, _, period = spec.partition("/")
+    period = period.strip().rstrip("s")  # "minutes" → "minute", "30s" → "30"
+    seconds = PERIODS[period] if period in PERIODS else float(period)
+    return float(count), float(count) / seconds
+
+
+def route_limits() -> dict[str, dict[str, tuple[float, float]]]:
+    limits = {}
+    for route, keys in ROUTE_LIMITS.items():
+        name = route.rsplit("/", 1)[-1].replace("-", "_").upper()
+        limits[route] = {
+            key: parse_limit(os.getenv(f"RATE_LIMIT_{name}_{key.upper()}") or spec)
+            for key, spec in keys.items()
+        }
+    return limits
+
+
+class RateLimiter:
+    """Token buckets in an LRU-ordered dict; thread-safe for FastAPI's threadpool."""
+
+    def __init__(self, limits: dict, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.limits = limits
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[tuple, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, route: str, key_type: str, key: str) -> float:
+        """Take one token. Returns 0 if allowed, else seconds until a token is available."""
+        limit = self.limits.get(route, {}).get(key_type)
+        if limit is None or not key:
+            return 0.0
+        capacity, rate = limit
+        bucket_key = (route, key_type, key)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(bucket_key)
+            if bucket is None:
+                bucket = self._buckets[bucket_key] = [capacity, now]
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)  # evict the least recently used key
+            else:
+                self._buckets.move_to_end(bucket_key)
+                bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+            return (1 - bucket[0]) / rate
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+def retry_after(wait: float) -> str:
+    return str(max(1, math.ceil(wait)))
+
+
+def client_ip(request) -> str:
+    return request.headers.get("x-real-ip") or (request.client.host if request.client else "")
@@ -0,0 +1,269 @@
+"""
+artifacts.py — SmartNRI Stage Artifacts
+Line-delimited (NDJSON) handoff files between stages, read and written one record at a time.
+Outputs: data/raw_content.ndjson, data/summaries.ndjson (+ raw_content.json / summaries.json via to_json)
+
+Rules:
+- One JSON object per line, appended and flushed as each record is produced
+- A stream opens with a header line {"_stream": name, "started": ts} and closes with {"_end": count};
+  a stage that fails still closes its stream, marked {"_end": count, "error": true}
+- Each run starts a new file (atomic rename), so a reader never sees two runs mixed together
+- read() and follow() hold one line at a time and yield slotted records (RawItem, Summary):
+  memory is constant per item, whatever the batch size
+- follow() tails a stream another stage is still writing, until its end marker
+- to_json() streams an artifact into the legacy JSON list file, so the batch consumers
+  (watchdog, static_pages, digest, the daemon) keep reading raw_content.json / summaries.json
+"""
+
+import os
+import json
+import time
+import logging
+from dataclasses import dataclass, field
+
+from config import DATA_DIR
+
+RAW_STREAM       = DATA_DIR / "raw_content.ndjson"
+SUMMARIES_STREAM = DATA_DIR / "summaries.ndjson"
+
+log = logging.getLogger("artifacts")
+
+FOLLOW_POLL_SEC    = float(os.getenv("FOLLOW_POLL_SEC", "0.5"))
+FOLLOW_TIMEOUT_SEC = float(os.getenv("FOLLOW_TIMEOUT_SEC", "900"))  # max wait for the next line
+
+CONTROL = '{"_'  # header and end-marker lines; records always start with "id"
+
+
+# ── Records ────────────────────────────────────────────────────────────
+
+class _Record:
+    """Dict-style access, so stage code written against dicts takes records unchanged."""
+    __slots__ = ()
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+    def __contains__(self, key: str) -> bool:
+        return hasattr(self, key)
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """Build a record, ignoring keys it has no slot for."""
+        names = cls.__match_args__
+        return cls(**{k: v for k, v in data.items() if k in names})
+
+    def to_dict(self) -> dict:
+        """Plain dict in field order (id first); unset optional fields are left out."""
+        values = ((k, getattr(self, k)) for k in self.__match_args__)
+        return {k: v for k, v in values if v is not None}
+
+
+@dataclass(slots=True)
+class RawItem(_Record):
+    """A scraped item on its way to the LLM (scraper.build_record)."""
+    id: str
+    source_id: str
+    source_name: str
+    source_url: str
+    domain: str
+    title: str
+    raw_text: str
+    date_found: str
+    tier: int = 1
+    badge: str = "GREEN"
+    country: str = ""
+    topics: list = field(default_factory=list)
+    published: str = ""
+    rank: int = 0
+    content_hash: str = ""
+    diff: dict | None = None
+
+
+@dataclass(slots=True)
+class Summary(_Record):
+    """An LLM summary ready to publish (summarizer.summarise)."""
+    id: str
+    source_id: str
+    source_name: str
+    source_url: str
+    domain: str
+    title: str
+    date: str
+    badge: str
+    so_what: str = ""
+    bullets: list = field(default_factory=list)
+    tier: int = 1
+    country: str = ""
+    topics: list = field(default_factory=list)
+    skip: bool = False
+
+
+def _encode(record) -> str:
+    data = record.to_dict() if isinstance(record, _Record) else record
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def _decode(line: str, kind):
+    data = json.loads(line)
+    return kind.from_dict(data) if kind else data
+
+
+# ── Writing ────────────────────────────────────────────────────────────
+
+class Writer:
+    """
+    Append records to a fresh stream. Use as a context manager; the end marker is
+    written on exit (flagged as an error if the block raised).
+    """
+
+    def __init__(self, path, name: str):
+        self.path = path
+        self.count = 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        self._f = open(tmp, "w", encoding="utf-8")
+        self._f.write(json.dumps({"_stream": name, "started": time.time()}) + "\n")
+        self._f.flush()
+        tmp.replace(path)  # readers switch to this run from here on
+
+    def write(self, record):
+        self._f.write(_encode(record))
+        self._f.flush()
+        self.count += 1
+
+    def close(self, error: bool = False):
+        if self._f.closed:
+            return
+        end = {"_end": self.count, "error": True} if error else {"_end": self.count}
+        self._f.write(json.dumps(end) + "\n")
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(error=exc_type is not None)
+
+
+def write(path, name: str, records) -> int:
+    """Write an iterable of records as one complete stream. Returns the record count."""
+    with Writer(path, name) as out:
+        for record in records:
+            out.write(record)
+    return out.count
+
+
+# ── Reading ────────────────────────────────────────────────────────────
+
+def read(path, kind=None, legacy=None):
+    """
+    Yield the records of a stream one at a time (as `kind`, or plain dicts).
+    Falls back to the legacy JSON list file if the stream has not been written yet.
+    """
+    if not path.exists():
+        if legacy is not None and legacy.exists():
+            with open(legacy, encoding="utf-8") as f:
+                for data in json.load(f):
+                    yield kind.from_dict(data) if kind else data
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith(CONTROL):
+                if json.loads(line).get("error"):
+                    log.warning(f"{path.name} was closed by a failed stage — records may be missing")
+                continue
+            if not line.endswith("\n"):
+                log.warning(f"{path.name} ends with a partial line — its writer is still running or died")
+                return
+            yield _decode(line, kind)
+
+
+def exists(path, legacy=None) -> bool:
+    return path.exists() or (legacy is not None and legacy.exists())
+
+
+def _finished(f) -> bool:
+    """True if the open stream already ends with its end marker."""
+    size = os.fstat(f.fileno()).st_size
+    offset = max(0, size - 256)
+    tail = os.pread(f.fileno(), size - offset, offset)  # leaves f's position alone
+    return tail.rstrip(b"\n").rsplit(b"\n", 1)[-1].startswith(b'{"_end"')
+
+
+def _open_run(path, since: float):
+    """Open the stream if it belongs to this run: still being written, or started after `since`."""
+    try:
+        f = open(path, encoding="utf-8")
+    except FileNotFoundError:
+        return None
+    header = f.readline()
+    if header.endswith("\n") and header.startswith(CONTROL):
+        if json.loads(header).get("started", 0) >= since or not _finished(f):
+            return f
+    f.close()
+    return None
+
+
+def follow(path, kind=None, since: float | None = None,
+           poll: float = FOLLOW_POLL_SEC, timeout: float = FOLLOW_TIMEOUT_SEC):
+    """
+    Tail a stream another stage is writing: yield each record as soon as its line is
+    complete, and stop at the end marker. Waits for the producer to start if needed —
+    a finished stream older than `since` (default: now) is a previous run and is skipped.
+    Raises TimeoutError if no new line arrives within `timeout` seconds, and
+    RuntimeError if the producer closed its stream after failing.
+    """
+    since = time.time() if since is None else since
+    deadline = time.monotonic() + timeout
+    f = None
+    partial = ""
+    try:
+        while True:
+            if f is None:
+                f = _open_run(path, since)
+            line = f.readline() if f else ""
+            if not line.endswith("\n"):
+                partial += line
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"No new line in {path.name} for {timeout:.0f}s — is its writer running?")
+                time.sleep(poll)
+                continue
+            line, partial = partial + line, ""
+            deadline = time.monotonic() + timeout
+            if line.startswith(CONTROL):
+                control = json.loads(line)
+                if "_end" in control:
+                    if control.get("error"):
+                        raise RuntimeError(f"{path.name} was closed by a failed stage after {control['_end']} records")
+                    return
+                continue
+            yield _decode(line, kind)
+    finally:
+        if f:
+            f.close()
+
+
+# ── Legacy JSON ────────────────────────────────────────────────────────
+
+def to_json(path, dest):
+    """Stream a stream's records into a JSON list file (written atomically), one line at a time."""
+    tmp = dest.with_name(dest.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as out:
+        out.write("[")
+        first = True
+        if path.exists():
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.startswith(CONTROL) or not line.endswith("\n"):
+                        continue
+                    out.write("\n  " if first else ",\n  ")
+                    out.write(line[:-1])
+                    first = False
+        out.write("\n]\n" if not first else "]\n")
+    tmp.replace(dest)
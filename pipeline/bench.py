@@ -0,0 +1,251 @@
+"""
+bench.py — SmartNRI Offline Benchmark
+Runs main.py end to end against recorded cassettes (HTTP_MODE=replay) with the
+stub LLM, and reports wall time, per-stage time and peak memory.
+
+Usage:
+  HTTP_MODE=record python main.py --dry-run   # capture cassettes once (live network)
+  python bench.py                              # 3 runs, compared against the stored baseline
+  python bench.py --runs 5 --stream            # benchmark streaming mode
+  python bench.py --latency 200 --error-rate 0.1   # simulate slow / flaky hosts
+  python bench.py --save-baseline              # store these numbers as the new baseline
+  python bench.py --parse --repeat 20          # parse throughput: in-thread vs process pool
+  python bench.py --digest-users 100000        # personalised digest build for N synthetic users
+
+Rules:
+- Every run starts from an empty data/ dir, so every item is new and goes through every stage
+- Nothing leaves the machine: sources come from the replay server, the LLM is stubbed,
+  Telegram and SMTP are blanked
+- A metric more than --tolerance % slower than the baseline fails the run (exit 1)
+- A run of main.py that exits non-zero aborts the benchmark — it is never compared or saved as a baseline
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import statistics
+import subprocess
+import tempfile
+from pathlib import Path
+
+PIPELINE_DIR  = Path(__file__).resolve().parent
+BASE_DIR      = PIPELINE_DIR.parent
+BASELINE_FILE = PIPELINE_DIR / "benchmarks" / "baseline.json"
+INDEX_HTML    = BASE_DIR / "frontend" / "index.html"
+DEFAULT_CASSETTES = BASE_DIR / "cassettes"
+
+
+def run_once(args: argparse.Namespace, cassettes: Path) -> dict:
+    """One end-to-end run of main.py in a scratch SMARTNRI_HOME."""
+    with tempfile.TemporaryDirectory(prefix="smartnri-bench-") as home:
+        home = Path(home)
+        (home / "frontend").mkdir()
+        shutil.copy(INDEX_HTML, home / "frontend" / "index.html")
+
+        env = dict(
+            os.environ,
+            SMARTNRI_HOME=str(home),
+            HTTP_MODE="replay",
+            CASSETTE_DIR=str(cassettes),
+            REPLAY_LATENCY_MS=str(args.latency),
+            REPLAY_ERROR_RATE=str(args.error_rate),
+            LLM_PROVIDER="stub",
+            STUB_LLM_LATENCY_MS=str(args.llm_latency),
+            CRAWL_DELAY="0",
+            TELEGRAM_BOT_TOKEN="",
+            SMTP_HOST="",
+        )
+        cmd = [sys.executable, str(PIPELINE_DIR / "main.py")] + (["--stream"] if args.stream else [])
+
+        started = time.perf_counter()
+        proc = subprocess.Popen(cmd, env=env, cwd=PIPELINE_DIR,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        wall = time.perf_counter() - started
+
+        timings_file = home / "logs" / "last_run_timings.json"
+        timings = json.loads(timings_file.read_text()) if timings_file.exists() else {"stages": {}}
+        return {
+            "wall": wall,
+            "stages": timings["stages"],
+            "peak_rss_mb": usage.ru_maxrss / 1024,  # Linux reports KiB
+            "exit_code": proc.returncode,
+        }
+
+
+def summarise_runs(runs: list[dict]) -> dict:
+    stages = sorted({name for r in runs for name in r["stages"]})
+    return {
+        "wall": round(statistics.median(r["wall"] for r in runs), 3),
+        "stages": {
+            name: round(statistics.median(r["stages"].get(name, 0.0) for r in runs), 3)
+            for name in stages
+        },
+        "peak_rss_mb": round(max(r["peak_rss_mb"] for r in runs), 1),
+    }
+
+
+def flatten(result: dict) -> dict:
+    flat = {"wall": result["wall"], "peak_rss_mb": result["peak_rss_mb"]}
+    flat.update({f"stage.{k}": v for k, v in result["stages"].items()})
+    return flat
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Print a delta table and return the metrics that regressed beyond tolerance."""
+    regressions = []
+    now, then = flatten(current), flatten(baseline)
+    print(f"{'metric':<22}{'baseline':>12}{'current':>12}{'delta':>10}")
+    for key in sorted(now):
+        if key not in then or not then[key]:
+            print(f"{key:<22}{'-':>12}{now[key]:>12.3f}{'new':>10}")
+            continue
+        delta = (now[key] - then[key]) / then[key] * 100
+        flag = "  ← regression" if delta > tolerance else ""
+        print(f"{key:<22}{then[key]:>12.3f}{now[key]:>12.3f}{delta:>+9.1f}%{flag}")
+        if flag:
+            regressions.append(key)
+    return regressions
+
+
+def bench_parse(args: argparse.Namespace, cassettes: Path):
+    """Parse every recorded page in-thread, then in the parser pool, and compare throughput."""
+    import parsers
+
+    sources = {s["url"]: s for s in json.loads((PIPELINE_DIR / "sources.json").read_text())}
+    pages = []
+    for meta_path in sorted(cassettes.glob("*.json")):
+        meta = json.loads(meta_path.read_text())
+        content_type = meta["content_type"]
+        if "html" not in content_type and "xml" not in content_type:
+            continue
+        is_feed = "rss" in content_type or "atom" in content_type
+        source = sources.get(meta["url"], {"url": meta["url"], "scrape_method": "rss" if is_feed else "html"})
+        body = meta_path.with_suffix(".body").read_bytes()
+        pages.append((source, body if source["scrape_method"] == "rss" else body.decode("utf-8", errors="replace")))
+    jobs = pages * args.repeat
+
+    started = time.perf_counter()
+    for source, body in jobs:
+        parsers.parse(source, body)
+    in_thread = time.perf_counter() - started
+
+    workers = parsers.PARSE_WORKERS or os.cpu_count() or 1
+    # Warm the pool first so process start-up isn't billed to throughput
+    for future in [parsers.submit(source, body, workers) for source, body in pages]:
+        future.result()
+    started = time.perf_counter()
+    for future in [parsers.submit(source, body, workers) for source, body in jobs]:
+        future.result()
+    pooled = time.perf_counter() - started
+
+    print(f"{len(pages)} recorded pages x {args.repeat} = {len(jobs)} parses")
+    print(f"in-thread : {len(jobs) / in_thread:8.1f} pages/s  ({in_thread:.2f}s)")
+    print(f"pool ({workers:>2}) : {len(jobs) / pooled:8.1f} pages/s  ({pooled:.2f}s)")
+    print(f"speed-up  : {in_thread / pooled:.2f}x")
+
+
+def bench_digest(args: argparse.Namespace):
+    """Build personalised digests for N synthetic users against a synthetic week of summaries."""
+    import random
+    import sqlite3
+    import digest
+
+    rng = random.Random(0)
+    countries = ["Malaysia", "Singapore", "UAE / Dubai", "United States", "United Kingdom", "Australia",
+                 "Canada", "Germany", "New Zealand", "Hong Kong", "Japan", "Other"]
+    roles = ["Salaried Employee", "Business Owner", "Freelancer / Consultant", "Student", "Retired", "Other"]
+    sources = json.loads((PIPELINE_DIR / "sources.json").read_text())
+    summaries = [
+        {"id": f"{s['id']}-{n}", "source_id": s["id"], "source_name": s["name"], "source_url": s["url"],
+         "country": s["country"], "topics": s["topics"], "badge": "GREEN",
+         "title": f"{s['name']} update {n}", "so_what": "What changed.", "bullets": ["Review it."]}
+        for s in sources for n in range(3)
+    ]
+
+    with tempfile.TemporaryDirectory(prefix="smartnri-bench-") as tmp:
+        db = Path(tmp) / "users.db"
+        conn = sqlite3.connect(db)
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, email TEXT, country TEXT, role TEXT)")
+        conn.executemany(
+            "INSERT INTO users (name, email, country, role) VALUES (?, ?, ?, ?)",
+            ((f"user{i}", f"user{i}@example.com", rng.choice(countries), rng.choice(roles))
+             for i in range(args.digest_users)),
+        )
+        conn.commit()
+        conn.close()
+
+        started = time.perf_counter()
+        stats = digest.build(summaries, digest.iter_users(str(db)), Path(tmp) / "out")
+        elapsed = time.perf_counter() - started
+
+    print(f"{stats['users']} users, {len(summaries)} items → {stats['groups']} interest groups, "
+          f"{stats['digests']} digests rendered")
+    print(f"digest build: {elapsed:.2f}s ({stats['users'] / elapsed:,.0f} users/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end pipeline benchmark")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--stream", action="store_true", help="benchmark main.py --stream")
+    parser.add_argument("--latency", type=float, default=0, help="replay latency per response (ms)")
+    parser.add_argument("--error-rate", type=float, default=0, help="fraction of replayed 503s")
+    parser.add_argument("--llm-latency", type=float, default=0, help="stub LLM latency per call (ms)")
+    parser.add_argument("--tolerance", type=float, default=20, help="allowed slowdown vs baseline (%%)")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--parse", action="store_true", help="compare in-thread vs process-pool parsing")
+    parser.add_argument("--repeat", type=int, default=10, help="parse each page this many times (--parse)")
+    parser.add_argument("--digest-users", type=int, default=0, help="benchmark digest.py with N synthetic users")
+    args = parser.parse_args()
+
+    if args.digest_users:
+        bench_digest(args)
+        return
+
+    cassettes = Path(os.getenv("CASSETTE_DIR", DEFAULT_CASSETTES))
+    if not any(cassettes.glob("*.json")):
+        sys.exit(f"No cassettes in {cassettes} — run `HTTP_MODE=record python main.py --dry-run` first.")
+
+    if args.parse:
+        bench_parse(args, cassettes)
+        return
+
+    scenario = f"{'stream' if args.stream else 'batch'}-lat{args.latency:g}-err{args.error_rate:g}-llm{args.llm_latency:g}"
+    runs = []
+    for i in range(args.runs):
+        result = run_once(args, cassettes)
+        runs.append(result)
+        print(f"run {i + 1}/{args.runs}: {result['wall']:.2f}s wall, "
+              f"{result['peak_rss_mb']:.0f} MB peak, exit {result['exit_code']}")
+        if result["exit_code"] != 0:
+            # A crashed run is fast for the wrong reason — never let it into the median or a baseline
+            sys.exit(f"Run {i + 1} failed (exit {result['exit_code']}) — aborting, nothing compared or saved. "
+                     f"Rerun main.py with the same env to see the error.")
+
+    current = summarise_runs(runs)
+    print(json.dumps({scenario: current}, indent=2))
+
+    baselines = json.loads(BASELINE_FILE.read_text()) if BASELINE_FILE.exists() else {}
+    if args.save_baseline:
+        baselines[scenario] = current
+        BASELINE_FILE.parent.mkdir(exist_ok=True)
+        BASELINE_FILE.write_text(json.dumps(baselines, indent=2) + "\n")
+        print(f"Baseline saved for {scenario} → {BASELINE_FILE}")
+        return
+
+    if scenario not in baselines:
+        print(f"No baseline for {scenario} yet — rerun with --save-baseline to store one.")
+        return
+
+    regressions = compare(current, baselines[scenario], args.tolerance)
+    if regressions:
+        print(f"REGRESSION in {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+cassette.py — SmartNRI HTTP Record / Replay
+Captures live source responses to disk and serves them back from a local HTTP
+server, so the pipeline can run offline and reproducibly.
+
+Modes (HTTP_MODE in .env):
+- live   — normal fetching (default)
+- record — fetch live and save every response to CASSETTE_DIR
+- replay — serve saved responses from a local server; nothing leaves the machine
+
+Replay knobs:
+- REPLAY_LATENCY_MS  — added delay per response
+- REPLAY_ERROR_RATE  — fraction of responses replaced by a 503 (0.0–1.0)
+- REPLAY_SEED        — RNG seed so injected errors are repeatable
+"""
+
+import os
+import json
+import time
+import random
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import BASE_DIR, HTTP_MODE
+
+CASSETTE_DIR = Path(os.getenv("CASSETTE_DIR", BASE_DIR / "cassettes"))
+
+log = logging.getLogger("cassette")
+
+REPLAY_LATENCY_MS = float(os.getenv("REPLAY_LATENCY_MS", "0"))
+REPLAY_ERROR_RATE = float(os.getenv("REPLAY_ERROR_RATE", "0"))
+REPLAY_SEED       = int(os.getenv("REPLAY_SEED", "0"))
+
+RECORDING = HTTP_MODE == "record"
+REPLAYING = HTTP_MODE == "replay"
+
+
+def cassette_key(url: str) -> str:
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()[:24]
+
+
+def record(url: str, body: bytes, status: int = 200, content_type: str = "text/html"):
+    """Save one response. Later recordings of the same URL overwrite earlier ones."""
+    CASSETTE_DIR.mkdir(parents=True, exist_ok=True)
+    key = cassette_key(url)
+    (CASSETTE_DIR / f"{key}.body").write_bytes(body)
+    meta = {"url": url, "status": status, "content_type": content_type, "recorded_at": time.time()}
+    with open(CASSETTE_DIR / f"{key}.json", "w") as f:
+        json.dump(meta, f, indent=2)
+    log.info(f"Recorded {url} ({len(body)} bytes)")
+
+
+def load(url: str) -> tuple[dict, bytes] | None:
+    key = cassette_key(url)
+    meta_path = CASSETTE_DIR / f"{key}.json"
+    if not meta_path.exists():
+        return None
+    with open(meta_path) as f:
+        meta = json.load(f)
+    return meta, (CASSETTE_DIR / f"{key}.body").read_bytes()
+
+
+# ── Replay server ──────────────────────────────────────────────────────
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        if server.latency_ms:
+            time.sleep(server.latency_ms / 1000)
+
+        with server.rng_lock:
+            inject_error = server.rng.random() < server.error_rate
+        if inject_error:
+            self.send_error(503, "Injected replay error")
+            return
+
+        key = self.path.lstrip("/")
+        path = CASSETTE_DIR / f"{key}.json"
+        if "/" in key or not path.exists():
+            self.send_error(404, "No cassette recorded for this URL")
+            return
+        with open(path) as f:
+            meta = json.load(f)
+        body = path.with_suffix(".body").read_bytes()
+        self.send_response(meta["status"])
+        self.send_header("Content-Type", meta["content_type"])
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client stopped reading early (bounded fetch) — expected
+
+    def log_message(self, format, *args):
+        log.debug(format % args)
+
+
+class ReplayServer:
+    """Local HTTP server that answers with recorded cassettes."""
+
+    def __init__(self, latency_ms: float = REPLAY_LATENCY_MS,
+                 error_rate: float = REPLAY_ERROR_RATE, seed: int = REPLAY_SEED):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), _ReplayHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.latency_ms = latency_ms
+        self.httpd.error_rate = error_rate
+        self.httpd.rng = random.Random(seed)
+        self.httpd.rng_lock = threading.Lock()
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="replay-server", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "ReplayServer":
+        self.thread.start()
+        log.info(f"Replay server on {self.base_url} serving {CASSETTE_DIR} "
+                 f"(latency {self.httpd.latency_ms:.0f}ms, error rate {self.httpd.error_rate:.0%})")
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+_server: ReplayServer | None = None
+_server_lock = threading.Lock()
+
+
+def replay_url(url: str) -> str:
+    """Map a live URL onto the local replay server, starting it on first use."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ReplayServer().start()
+    return f"{_server.base_url}/{cassette_key(url)}"
@@ -0,0 +1,70 @@
+"""
+check_import_time.py — SmartNRI Cold-Start Guard
+Imports each pipeline entry module in a fresh interpreter under `python -X importtime`
+and fails if it is over budget or pulls in a heavy dependency at import time.
+
+Usage:
+  python check_import_time.py              # exit 1 on any violation
+  python check_import_time.py --budget 50  # per-module budget in ms
+
+Rules:
+- bs4, feedparser, requests, openai, google.genai, playwright, pymupdf and http.server
+  must only load inside the stage that needs them
+- Each module's cumulative import time must stay under IMPORT_BUDGET_MS (default 100)
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+from pathlib import Path
+
+PIPELINE_DIR = Path(__file__).resolve().parent
+
+MODULES = ["main", "scraper", "summarizer", "publisher", "watchdog", "scheduler", "streaming", "digest"]
+HEAVY = ["bs4", "feedparser", "requests", "openai", "google.genai", "playwright", "pymupdf", "fitz", "http.server"]
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "100"))
+
+
+def import_profile(module: str) -> dict[str, int]:
+    """Cumulative import time (µs) of every module loaded by `import <module>`."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PIPELINE_DIR, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Guard pipeline import time")
+    parser.add_argument("--budget", type=float, default=IMPORT_BUDGET_MS, help="per-module budget (ms)")
+    args = parser.parse_args()
+
+    failures = []
+    for module in MODULES:
+        times = import_profile(module)
+        total_ms = times.get(module, 0) / 1000
+        heavy = [h for h in HEAVY if h in times]
+        status = "ok"
+        if total_ms > args.budget:
+            status = "OVER BUDGET"
+            failures.append(f"{module}: {total_ms:.1f} ms > {args.budget:.0f} ms")
+        if heavy:
+            status = "HEAVY IMPORT"
+            failures.append(f"{module}: imports {', '.join(heavy)} eagerly")
+        print(f"{module:<12}{total_ms:>8.1f} ms  {status}")
+
+    if failures:
+        print("\n".join(["", "Import-time check FAILED:"] + [f"  - {f}" for f in failures]))
+        sys.exit(1)
+    print("Import-time check passed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+config.py — SmartNRI Pipeline Bootstrap
+The one place that loads .env, defines shared paths and configures logging.
+
+Rules:
+- Every pipeline module imports its paths from here — none calls load_dotenv() itself
+- Import this before reading os.getenv() so .env values are visible
+- Logging is configured once, by whichever entry point runs first (setup_logging)
+- Log writes are queued to a background thread; files rotate (LOG_ROTATE, LOG_MAX_BYTES, LOG_BACKUPS)
+- Several processes share the log files (main.py, --worker, digest/mailer cron): writes and rollovers
+  take an flock, and a process whose file was rotated by another reopens it
+- Keep this module light: no third-party imports beyond python-dotenv
+"""
+
+import os
+import logging
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PIPELINE_DIR = Path(__file__).resolve().parent
+BASE_DIR     = Path(os.getenv("SMARTNRI_HOME", PIPELINE_DIR.parent))
+DATA_DIR     = BASE_DIR / "data"
+LOG_DIR      = BASE_DIR / "logs"
+FRONTEND_DIR = BASE_DIR / "frontend"
+
+DATA_DIR.mkdir(parents=True, exist_ok=True)
+LOG_DIR.mkdir(parents=True, exist_ok=True)
+
+HTTP_MODE = os.getenv("HTTP_MODE", "live").lower()  # "live", "record" or "replay"
+
+LOG_FORMAT    = "%(asctime)s [%(levelname)s] %(message)s"
+LOG_ROTATE    = os.getenv("LOG_ROTATE", "size").lower()       # "size" or "time"
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(5 * 2**20)))
+LOG_BACKUPS   = int(os.getenv("LOG_BACKUPS", "5"))
+LOG_JSON      = os.getenv("LOG_JSON", "0") == "1"             # also write logs/pipeline.jsonl
+
+_listener: "logging.handlers.QueueListener | None" = None
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per line — easy to ship to a log store or grep with jq."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        import json
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _SharedRotation:
+    """
+    Mixin for the rotating handlers: each write (and any rollover) happens under an flock
+    on <log>.lock, and the stream is reopened first if another process rotated the file,
+    so concurrent rollovers never drop lines or overwrite each other's backups.
+    """
+    _lock_file = None
+    _inode = None
+
+    def _open(self):
+        stream = super()._open()
+        self._inode = os.fstat(stream.fileno()).st_ino
+        return stream
+
+    def _reopen_if_rotated(self):
+        try:
+            inode = os.stat(self.baseFilename).st_ino
+        except FileNotFoundError:
+            inode = None
+        if self.stream is not None and inode != self._inode:
+            self.stream.close()
+            self.stream = self._open()
+            if hasattr(self, "computeRollover"):
+                import time
+                self.rolloverAt = self.computeRollover(time.time())
+
+    def emit(self, record):
+        import fcntl
+        if self._lock_file is None:
+            self._lock_file = open(self.baseFilename + ".lock", "a")
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        try:
+            self._reopen_if_rotated()
+            super().emit(record)
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def close(self):
+        super().close()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+
+def _file_handler(path: Path) -> logging.Handler:
+    from logging.handlers import RotatingFileHandler, TimedRotatingFileHandler
+
+    class SharedTimedRotatingFileHandler(_SharedRotation, TimedRotatingFileHandler):
+        pass
+
+    class SharedRotatingFileHandler(_SharedRotation, RotatingFileHandler):
+        pass
+
+    if LOG_ROTATE == "time":
+        return SharedTimedRotatingFileHandler(path, when="midnight", backupCount=LOG_BACKUPS, encoding="utf-8")
+    return SharedRotatingFileHandler(path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8")
+
+
+def setup_logging():
+    """
+    Route every pipeline logger through a queue to a background listener thread,
+    so callers never block on file I/O. The listener writes logs/pipeline.log
+    (rotated by size or daily), the console, and optionally logs/pipeline.jsonl.
+    Scraper errors are also copied to logs/scraper_errors.log. Safe to call repeatedly.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    import queue
+    import atexit
+    from logging.handlers import QueueHandler, QueueListener
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [_file_handler(LOG_DIR / "pipeline.log"), logging.StreamHandler()]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    if LOG_JSON:
+        json_handler = _file_handler(LOG_DIR / "pipeline.jsonl")
+        json_handler.setFormatter(JsonLinesFormatter())
+        handlers.append(json_handler)
+
+    scraper_errors = _file_handler(LOG_DIR / "scraper_errors.log")
+    scraper_errors.setLevel(logging.ERROR)
+    scraper_errors.addFilter(logging.Filter("scraper"))
+    scraper_errors.setFormatter(formatter)
+    handlers.append(scraper_errors)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.addHandler(QueueHandler(log_queue))
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def flush_logging():
+    """Block until every queued record has been written (e.g. before tailing the log)."""
+    if _listener is not None:
+        _listener.stop()
+        _listener.start()
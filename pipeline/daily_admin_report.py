@@ -1,17 +1,12 @@
 import os
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
 from datetime import datetime
 
+import sqlite3
+
+import mailer  # SMTP settings (SMTP_HOST, SMTP_USER, SMTP_FROM...) come from .env via config.py
+
 # Configuration
 ADMIN_EMAIL = "Bharatsamant@gmail.com"
-SENDER_EMAIL = os.environ.get("SENDER_EMAIL", "no-reply@smartnri.com")
-SMTP_SERVER = os.environ.get("SMTP_SERVER", "smtp.example.com")
-SMTP_PORT = int(os.environ.get("SMTP_PORT", 587))
-SMTP_PASSWORD = os.environ.get("SMTP_PASSWORD", "")
-
-import sqlite3
 
 DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "backend", "data", "smartnri.db")
 
@@ -87,26 +82,23 @@ def send_admin_report():
     </html>
     """
 
-    # Email construction
-    msg = MIMEMultipart('alternative')
-    msg['Subject'] = f"SmartNRI Daily Report: {len(registrations)} Users, {len(bugs)} Reports"
-    msg['From'] = SENDER_EMAIL
-    msg['To'] = ADMIN_EMAIL
-
-    msg.attach(MIMEText(html_content, 'html'))
+    subject = f"SmartNRI Daily Report: {len(registrations)} Users, {len(bugs)} Reports"
 
-    # Send Email
-    try:
-        # NOTE: You will need valid SMTP credentials configured in your environment
-        # server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-        # server.starttls()
-        # server.login(SENDER_EMAIL, SMTP_PASSWORD)
-        # server.sendmail(SENDER_EMAIL, ADMIN_EMAIL, msg.as_string())
-        # server.quit()
-        print(f"Successfully generated report for {ADMIN_EMAIL}.")
+    # Send Email — spooled first, so a failed send is retried by the next watchdog run or `python mailer.py`
+    if not mailer.configured():
+        print("SMTP not configured (SMTP_HOST, SMTP_USER, SMTP_PASS) — report not sent.")
         print("--- EMAIL CONTENT PREVIEW ---")
         print(html_content)
         print("-------------------------------")
+        return
+    try:
+        status = mailer.send([ADMIN_EMAIL], subject, html_content, subtype="html")
+        if status.get("sent"):
+            print(f"Successfully sent report to {ADMIN_EMAIL}.")
+        elif status.get("failed"):
+            print(f"Report to {ADMIN_EMAIL} was rejected by the SMTP server — not retried (see data/mail_spool.db).")
+        else:
+            print(f"Report to {ADMIN_EMAIL} not delivered yet — queued in the mail spool for retry.")
     except Exception as e:
         print(f"Failed to send email: {e}")
 
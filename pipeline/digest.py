@@ -0,0 +1,237 @@
+"""
+digest.py — SmartNRI Personalised Digests
+Builds every registered user's digest from summaries.ndjson in one pass.
+Outputs: data/digests/<date>/ — one rendered digest per distinct interest set + manifest.json
+
+Rules:
+- A user's interests come from their country and role (audiences.json), never per-user queries
+- Users with the same interests share one interest group; each group's digest is rendered once
+- Items are matched against an inverted index topic → bitset of groups, in one pass over items
+- Users are streamed from SQLite (USERS_DB) — memory grows with interest groups, not users
+- manifest.json lists each group's rendered file, item ids and recipient emails
+- Groups with no matching items get no digest
+- send() spools each group's digest once for all its recipients (mailer.py); re-sending is a no-op
+"""
+
+import os
+import json
+import html
+import sqlite3
+import logging
+import datetime
+
+from config import BASE_DIR, DATA_DIR, PIPELINE_DIR, setup_logging
+import artifacts
+
+SUMMARIES_IN   = DATA_DIR / "summaries.json"
+DIGEST_DIR     = DATA_DIR / "digests"
+AUDIENCES_FILE = PIPELINE_DIR / "audiences.json"
+SOURCES_FILE   = PIPELINE_DIR / "sources.json"
+USERS_DB       = os.getenv("USERS_DB", str(BASE_DIR / "backend" / "data" / "smartnri.db"))
+
+log = logging.getLogger("digest")
+
+DIGEST_MAX_ITEMS = int(os.getenv("DIGEST_MAX_ITEMS", "8"))
+FETCH_BATCH      = 5000
+
+BADGE_EMOJI = {"GREEN": "🟢", "ORANGE": "🟠", "BLUE": "🔵", "RED": "🔴"}
+
+
+# ── Interest sets ──────────────────────────────────────────────────────
+
+def load_audiences() -> dict:
+    with open(AUDIENCES_FILE) as f:
+        return json.load(f)
+
+
+def country_lookup(audiences: dict) -> dict[str, str]:
+    """Lower-cased registration label or alias → country key."""
+    lookup = {}
+    for key, country in audiences["countries"].items():
+        lookup[key] = key
+        for alias in country.get("aliases", []):
+            lookup[alias.strip().lower()] = key
+    return lookup
+
+
+def interests(country: str, role: str, audiences: dict, lookup: dict) -> frozenset[str]:
+    """A user's interest set as "<source country>:<topic>" tokens."""
+    home = audiences["home_country"]
+    excluded = set(audiences["roles"].get(role, {}).get("exclude", []))
+    tokens = {f"{home}:{t}" for t in audiences["home_topics"] if t not in excluded}
+    key = lookup.get((country or "").strip().lower())
+    if key:
+        tokens |= {f"{key}:{t}" for t in audiences["countries"][key]["topics"] if t not in excluded}
+    return frozenset(tokens)
+
+
+def item_tokens(item: dict, sources: dict) -> set[str]:
+    """The same "<country>:<topic>" tokens for a summary (older summaries fall back to sources.json)."""
+    source = sources.get(item.get("source_id"), {})
+    country = item.get("country") or source.get("country", "")
+    topics = item.get("topics") or source.get("topics", [])
+    return {f"{country}:{t}" for t in topics}
+
+
+# ── Users → groups ─────────────────────────────────────────────────────
+
+def iter_users(db_path: str = USERS_DB):
+    """Yield (email, country, role) rows in batches; nothing if the backend DB doesn't exist yet."""
+    if not os.path.exists(db_path):
+        log.warning(f"Users DB not found at {db_path} — no digests to build.")
+        return
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        cur = conn.execute("SELECT email, country, role FROM users")
+        while rows := cur.fetchmany(FETCH_BATCH):
+            yield from rows
+    finally:
+        conn.close()
+
+
+def build_groups(users, audiences: dict) -> tuple[list[frozenset[str]], list[list[str]]]:
+    """
+    Bucket users by interest set. (country, role) pairs repeat across users,
+    so each distinct pair is resolved once. Returns (group interests, group recipients).
+    """
+    lookup = country_lookup(audiences)
+    by_profile: dict[tuple[str, str], int] = {}
+    by_interests: dict[frozenset[str], int] = {}
+    groups: list[frozenset[str]] = []
+    recipients: list[list[str]] = []
+
+    for email, country, role in users:
+        profile = (country, role)
+        group = by_profile.get(profile)
+        if group is None:
+            tokens = interests(country, role, audiences, lookup)
+            group = by_interests.get(tokens)
+            if group is None:
+                group = by_interests[tokens] = len(groups)
+                groups.append(tokens)
+                recipients.append([])
+            by_profile[profile] = group
+        recipients[group].append(email)
+    return groups, recipients
+
+
+def build_index(groups: list[frozenset[str]]) -> dict[str, int]:
+    """Inverted index: token → bitset (int) of the groups interested in it."""
+    index: dict[str, int] = {}
+    for group, tokens in enumerate(groups):
+        bit = 1 << group
+        for token in tokens:
+            index[token] = index.get(token, 0) | bit
+    return index
+
+
+def match(items, index: dict[str, int], group_count: int, sources: dict) -> list[list[dict]]:
+    """One pass over items: each item lands in every group whose bit is set for any of its tokens."""
+    per_group: list[list[dict]] = [[] for _ in range(group_count)]
+    for item in items:
+        mask = 0
+        for token in item_tokens(item, sources):
+            mask |= index.get(token, 0)
+        while mask:
+            low = mask & -mask
+            group = low.bit_length() - 1
+            if len(per_group[group]) < DIGEST_MAX_ITEMS:
+                per_group[group].append(item)
+            mask ^= low
+    return per_group
+
+
+# ── Rendering ──────────────────────────────────────────────────────────
+
+def render(items: list[dict], today: str) -> tuple[str, str]:
+    """Render one digest (subject, HTML body) — called once per interest group."""
+    subject = f"SmartNRI — {len(items)} update{'s' if len(items) != 1 else ''} for you ({today})"
+    rows = []
+    for item in items:
+        bullets = "".join(f"<li>{html.escape(b)}</li>" for b in item.get("bullets", []))
+        rows.append(
+            f"<h3>{BADGE_EMOJI.get(item['badge'], '🟢')} {html.escape(item['title'])}</h3>"
+            f"<p><em>{html.escape(item.get('so_what', ''))}</em></p>"
+            f"<ul>{bullets}</ul>"
+            f"<p><a href=\"{html.escape(item['source_url'])}\">Source: {html.escape(item['source_name'])}</a></p>"
+        )
+    body = (
+        f"<html><body><h2>SmartNRI — This Week's Signals</h2>{''.join(rows)}"
+        f"<p><small>SmartNRI — Verified intelligence for Indian expats.</small></p></body></html>"
+    )
+    return subject, body
+
+
+def build(summaries, users, out_dir=None) -> dict:
+    """Build and write every group's digest. Returns run stats."""
+    audiences = load_audiences()
+    with open(SOURCES_FILE) as f:
+        sources = {s["id"]: s for s in json.load(f)}
+    today = datetime.date.today().isoformat()
+    out_dir = out_dir or DIGEST_DIR / today
+
+    groups, recipients = build_groups(users, audiences)
+    per_group = match(summaries, build_index(groups), len(groups), sources)
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest = []
+    for group, items in enumerate(per_group):
+        if not items or not recipients[group]:
+            continue
+        subject, body = render(items, today)
+        path = out_dir / f"group-{group:04d}.html"
+        path.write_text(body, encoding="utf-8")
+        manifest.append({
+            "group": group,
+            "interests": sorted(groups[group]),
+            "subject": subject,
+            "file": path.name,
+            "items": [i["id"] for i in items],
+            "recipients": recipients[group],
+        })
+
+    tmp = out_dir / "manifest.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    tmp.replace(out_dir / "manifest.json")
+
+    stats = {
+        "users": sum(len(r) for r in recipients),
+        "groups": len(groups),
+        "digests": len(manifest),
+        "recipients": sum(len(m["recipients"]) for m in manifest),
+    }
+    log.info(f"Digest built — {stats['users']} users in {stats['groups']} interest groups, "
+             f"{stats['digests']} digests rendered for {stats['recipients']} recipients → {out_dir}")
+    return stats
+
+
+def send(out_dir) -> dict:
+    """Spool every digest in out_dir's manifest and deliver the spool."""
+    import mailer
+
+    with open(out_dir / "manifest.json") as f:
+        manifest = json.load(f)
+    for entry in manifest:
+        body = (out_dir / entry["file"]).read_text(encoding="utf-8")
+        mailer.enqueue(entry["recipients"], entry["subject"], body, subtype="html",
+                       key=f"digest:{out_dir.name}:{entry['file']}")
+    return mailer.deliver()
+
+
+def run(deliver: bool = True) -> dict:
+    if not artifacts.exists(artifacts.SUMMARIES_STREAM, legacy=SUMMARIES_IN):
+        log.warning("summaries.ndjson not found — nothing to digest.")
+        return {}
+    summaries = artifacts.read(artifacts.SUMMARIES_STREAM, artifacts.Summary, legacy=SUMMARIES_IN)
+    out_dir = DIGEST_DIR / datetime.date.today().isoformat()
+    stats = build(summaries, iter_users(), out_dir)
+    if deliver:
+        stats["mail"] = send(out_dir)
+    return stats
+
+
+if __name__ == "__main__":
+    # Intended for a weekly cron, e.g. 0 7 * * 1 python pipeline/digest.py
+    setup_logging()
+    run()
@@ -0,0 +1,175 @@
+"""
+leases.py — SmartNRI Source Leases for Sharded Workers
+Lets several `main.py --worker` processes — on one host or several hosts sharing
+the data volume — split the source list between them with no queue service.
+
+Rules:
+- A worker claims one source at a time with a lease that expires after LEASE_TTL_SEC
+- Each source is crawled once per round; finished sources are marked done
+- Without --round, workers join the open round; the first worker after a merge starts a new one,
+  so every batch of workers (e.g. each cron run) crawls afresh
+- A lease whose worker died expires and is reassigned to the next worker that asks
+- When every source of the round is done, exactly one worker wins the merge lease and
+  runs selection, summarising and publishing
+- Leases live in LEASE_DB (default data/leases.db); claims use BEGIN IMMEDIATE so only one
+  worker can win a source
+"""
+
+import os
+import time
+import socket
+import sqlite3
+import logging
+
+from config import DATA_DIR
+
+LEASE_DB = os.getenv("LEASE_DB", str(DATA_DIR / "leases.db"))
+
+log = logging.getLogger("leases")
+
+LEASE_TTL_SEC   = float(os.getenv("LEASE_TTL_SEC", "300"))
+LEASE_POLL_SEC  = float(os.getenv("LEASE_POLL_SEC", "5"))
+MERGE_KEY       = "__merge__"
+ROUND_KEY       = "__round__"   # its done_round holds the open round's id
+
+
+def worker_id() -> str:
+    return os.getenv("WORKER_ID", "") or f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _db() -> sqlite3.Connection:
+    conn = sqlite3.connect(LEASE_DB, timeout=30, isolation_level=None)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS leases (
+            source_id TEXT PRIMARY KEY,
+            worker TEXT,
+            expires REAL NOT NULL DEFAULT 0,
+            done_round TEXT
+        )
+    """)
+    return conn
+
+
+def _claim(conn: sqlite3.Connection, keys: list[str], round_id: str, worker: str) -> str | None:
+    """Atomically lease the first key not done this round and not held by a live lease."""
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        rows = {r[0]: r[1:] for r in conn.execute(
+            f"SELECT source_id, worker, expires, done_round FROM leases "
+            f"WHERE source_id IN ({','.join('?' * len(keys))})", keys)}
+        for key in keys:
+            holder, expires, done_round = rows.get(key, (None, 0, None))
+            if done_round == round_id or (holder and expires > now):
+                continue
+            conn.execute(
+                "INSERT INTO leases (source_id, worker, expires) VALUES (?, ?, ?) "
+                "ON CONFLICT(source_id) DO UPDATE SET worker = excluded.worker, expires = excluded.expires",
+                (key, worker, now + LEASE_TTL_SEC),
+            )
+            conn.execute("COMMIT")
+            if holder and holder != worker:
+                log.warning(f"Lease on {key} expired ({holder}) — reassigned to {worker}")
+            return key
+        conn.execute("COMMIT")
+        return None
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def claim(source_ids: list[str], round_id: str, worker: str) -> str | None:
+    """Lease the next unfinished source of this round, or None if all are done or leased."""
+    if not source_ids:
+        return None
+    conn = _db()
+    try:
+        return _claim(conn, source_ids, round_id, worker)
+    finally:
+        conn.close()
+
+
+def renew(source_id: str, worker: str) -> bool:
+    """Extend a held lease. False if it expired and another worker took it."""
+    conn = _db()
+    try:
+        cur = conn.execute("UPDATE leases SET expires = ? WHERE source_id = ? AND worker = ?",
+                           (time.time() + LEASE_TTL_SEC, source_id, worker))
+        return cur.rowcount == 1
+    finally:
+        conn.close()
+
+
+def complete(source_id: str, round_id: str, worker: str):
+    """Mark a leased source done for this round and release it."""
+    conn = _db()
+    try:
+        conn.execute("UPDATE leases SET done_round = ?, worker = NULL, expires = 0 "
+                     "WHERE source_id = ? AND worker = ?", (round_id, source_id, worker))
+    finally:
+        conn.close()
+
+
+def pending(source_ids: list[str], round_id: str) -> int:
+    """How many sources are not done yet this round (leased or unclaimed)."""
+    if not source_ids:
+        return 0
+    conn = _db()
+    try:
+        done = conn.execute(
+            f"SELECT COUNT(*) FROM leases WHERE done_round = ? "
+            f"AND source_id IN ({','.join('?' * len(source_ids))})", (round_id, *source_ids),
+        ).fetchone()[0]
+    finally:
+        conn.close()
+    return len(source_ids) - done
+
+
+def current_round(worker: str) -> str:
+    """The open round, or a new one if the last round has been merged (or none exists yet)."""
+    import datetime
+
+    conn = _db()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT done_round FROM leases WHERE source_id = ?", (ROUND_KEY,)).fetchone()
+            round_id = row[0] if row else None
+            if round_id is None or _merged(conn, round_id):
+                round_id = datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+                conn.execute(
+                    "INSERT INTO leases (source_id, done_round) VALUES (?, ?) "
+                    "ON CONFLICT(source_id) DO UPDATE SET done_round = excluded.done_round",
+                    (ROUND_KEY, round_id),
+                )
+                log.info(f"Round {round_id} started by {worker}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+    return round_id
+
+
+def _merged(conn: sqlite3.Connection, round_id: str) -> bool:
+    return conn.execute("SELECT 1 FROM leases WHERE source_id = ? AND done_round = ?",
+                        (MERGE_KEY, round_id)).fetchone() is not None
+
+
+def merged(round_id: str) -> bool:
+    """True once a worker has merged and published this round."""
+    conn = _db()
+    try:
+        return _merged(conn, round_id)
+    finally:
+        conn.close()
+
+
+def claim_merge(round_id: str, worker: str) -> bool:
+    """True for exactly one worker per round (until its lease expires without completing)."""
+    return claim([MERGE_KEY], round_id, worker) == MERGE_KEY
+
+
+def complete_merge(round_id: str, worker: str):
+    complete(MERGE_KEY, round_id, worker)
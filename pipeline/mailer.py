@@ -0,0 +1,377 @@
+"""
+mailer.py — SmartNRI Mail Delivery
+One place that sends email: watchdog alerts, the daily admin report and digests.
+Messages go into a persistent spool first and are delivered over pooled SMTP sessions.
+
+Usage:
+  python mailer.py              # deliver everything due in the spool (cron / after a digest)
+
+Rules:
+- Spool lives in data/mail_spool.db — a message body is stored once, with one outbox row per recipient
+- Connections are opened, STARTTLS'd and logged in once, then reused (MAIL_POOL_SIZE sessions)
+- Each worker sends MAIL_BATCH_SIZE messages over one session before handing it back
+- Sending is throttled to MAIL_RATE_PER_SEC across all sessions
+- 4xx replies and dropped connections are retried with exponential backoff, up to MAIL_MAX_ATTEMPTS;
+  5xx replies fail the recipient for good
+- send() delivers only its own message, so an alert never waits behind a digest backlog;
+  other due rows are retried by the watchdog (within a time budget) and `python mailer.py`
+- Rows are claimed under BEGIN IMMEDIATE and only while still 'queued', so overlapping
+  deliver() runs (digest cron + watchdog) never send the same row twice
+- Enqueueing with a key is idempotent — re-running a digest does not mail anyone twice
+- Configured = SMTP_HOST plus SMTP_USER/SMTP_PASS; only SMTP_STARTTLS=0 allows a blank SMTP_USER
+  (a local test server, e.g. python -m aiosmtpd -n)
+"""
+
+import os
+import time
+import queue
+import sqlite3
+import logging
+import threading
+
+from config import DATA_DIR, setup_logging
+
+SPOOL_DB = DATA_DIR / "mail_spool.db"
+
+log = logging.getLogger("mailer")
+
+SMTP_HOST     = os.getenv("SMTP_HOST", "")
+SMTP_PORT     = int(os.getenv("SMTP_PORT", "587"))
+SMTP_USER     = os.getenv("SMTP_USER", "")
+SMTP_PASS     = os.getenv("SMTP_PASS", "")
+SMTP_FROM     = os.getenv("SMTP_FROM", "") or SMTP_USER or "no-reply@smartnri.com"
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1") == "1"
+SMTP_TIMEOUT  = 30
+
+MAIL_POOL_SIZE     = int(os.getenv("MAIL_POOL_SIZE", "2"))
+MAIL_BATCH_SIZE    = int(os.getenv("MAIL_BATCH_SIZE", "50"))
+MAIL_RATE_PER_SEC  = float(os.getenv("MAIL_RATE_PER_SEC", "10"))   # 0 = unthrottled
+MAIL_MAX_ATTEMPTS  = int(os.getenv("MAIL_MAX_ATTEMPTS", "5"))
+MAIL_RETRY_BASE_SEC = float(os.getenv("MAIL_RETRY_BASE_SEC", "60"))
+MAIL_KEEP_DAYS     = 7
+IDLE_CHECK_SEC     = 30   # idle sessions older than this are NOOP-checked before reuse
+SENDING_STALE_SEC  = 3600 # rows left "sending" by a crashed run are retried after this
+
+SENT, RETRY, FAILED = "sent", "retry", "failed"
+
+_pool: "SMTPPool | None" = None
+
+
+def configured() -> bool:
+    if not SMTP_HOST:
+        return False
+    return bool(SMTP_USER and SMTP_PASS) or not SMTP_STARTTLS
+
+
+# ── Spool ──────────────────────────────────────────────────────────────
+
+def _db() -> sqlite3.Connection:
+    conn = sqlite3.connect(SPOOL_DB, timeout=30)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            key TEXT UNIQUE,
+            sender TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            body TEXT NOT NULL,
+            subtype TEXT NOT NULL,
+            created REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            message_id INTEGER NOT NULL REFERENCES messages(id),
+            recipient TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt REAL NOT NULL DEFAULT 0,
+            claimed_at REAL,
+            sent_at REAL,
+            last_error TEXT
+        );
+        CREATE INDEX IF NOT EXISTS outbox_due ON outbox(status, next_attempt);
+    """)
+    return conn
+
+
+def enqueue(recipients: list[str], subject: str, body: str, subtype: str = "plain",
+            key: str | None = None) -> int | None:
+    """
+    Spool one message for many recipients. Returns its message id, or None if
+    a message with this key was already spooled.
+    """
+    conn = _db()
+    try:
+        with conn:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO messages (key, sender, subject, body, subtype, created) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, SMTP_FROM, subject, body, subtype, time.time()),
+            )
+            if not cur.rowcount:
+                log.info(f"Already spooled: {key}")
+                return None
+            message_id = cur.lastrowid
+            conn.executemany(
+                "INSERT INTO outbox (message_id, recipient) VALUES (?, ?)",
+                ((message_id, r) for r in recipients),
+            )
+    finally:
+        conn.close()
+    log.info(f"Spooled '{subject[:60]}' for {len(recipients)} recipient(s)")
+    return message_id
+
+
+# ── Connection pool + throttle ─────────────────────────────────────────
+
+class SMTPPool:
+    """Authenticated SMTP sessions, reused across batches and across deliver() calls."""
+
+    def __init__(self):
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+
+    def _connect(self):
+        import smtplib
+        s = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+        try:
+            if SMTP_STARTTLS:
+                s.starttls()
+            if SMTP_USER:
+                s.login(SMTP_USER, SMTP_PASS)
+        except Exception:
+            self.discard(s)
+            raise
+        log.info(f"SMTP session opened to {SMTP_HOST}:{SMTP_PORT}")
+        return s
+
+    def acquire(self):
+        while True:
+            try:
+                s, idle_since = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if time.monotonic() - idle_since < IDLE_CHECK_SEC:
+                return s
+            try:
+                if s.noop()[0] == 250:
+                    return s
+            except Exception:
+                pass
+            self.discard(s)
+
+    def release(self, s):
+        self._idle.put((s, time.monotonic()))
+
+    def discard(self, s):
+        try:
+            s.quit()
+        except Exception:
+            s.close()
+
+    def close(self):
+        while True:
+            try:
+                s, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self.discard(s)
+
+
+class Throttle:
+    """Spaces sends at least 1/rate seconds apart, shared by every worker."""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def pool() -> SMTPPool:
+    global _pool
+    if _pool is None:
+        import atexit
+        _pool = SMTPPool()
+        atexit.register(_pool.close)
+    return _pool
+
+
+# ── Delivery ───────────────────────────────────────────────────────────
+
+def _outcome(e: Exception) -> str:
+    """Permanent (5xx) vs transient (4xx, network) failure."""
+    import smtplib
+    if isinstance(e, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in e.recipients.values()]
+        return FAILED if codes and min(codes) >= 500 else RETRY
+    if isinstance(e, smtplib.SMTPResponseException):
+        return FAILED if e.smtp_code >= 500 else RETRY
+    return RETRY
+
+
+def _build(message: tuple, recipient: str) -> str:
+    from email.mime.text import MIMEText
+    from email.utils import formatdate, make_msgid
+    sender, subject, body, subtype = message
+    msg = MIMEText(body, subtype, "utf-8")
+    msg["Subject"]    = subject
+    msg["From"]       = sender
+    msg["To"]         = recipient
+    msg["Date"]       = formatdate(localtime=True)
+    msg["Message-ID"] = make_msgid(domain=sender.rpartition("@")[2] or None)
+    return msg.as_string()
+
+
+def _send_batch(batch: list[tuple], messages: dict, throttle: Throttle) -> list[tuple]:
+    """Send a batch over one pooled session. Returns [(outbox_id, outcome, error)]."""
+    import smtplib
+
+    results = []
+    s = None
+    for n, (row_id, message_id, recipient) in enumerate(batch):
+        if s is None:
+            try:
+                s = pool().acquire()
+            except Exception as e:
+                # Server unreachable or login refused — retry the whole remainder later
+                log.error(f"SMTP connect failed: {e}")
+                results += [(r[0], RETRY, str(e)[:300]) for r in batch[n:]]
+                return results
+        message = messages[message_id]
+        try:
+            throttle.wait()
+            s.sendmail(message[0], [recipient], _build(message, recipient))
+            results.append((row_id, SENT, None))
+        except Exception as e:
+            results.append((row_id, _outcome(e), str(e)[:300]))
+            if isinstance(e, (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)):
+                try:
+                    s.rset()  # session is still good, clear the failed transaction
+                    continue
+                except Exception:
+                    pass
+            pool().discard(s)
+            s = None  # reconnect for the rest of the batch
+    if s is not None:
+        pool().release(s)
+    return results
+
+
+def _claim(conn: sqlite3.Connection, scope: str, params: tuple, limit: int) -> list[tuple]:
+    """Mark up to `limit` due rows 'sending' and return them; rows another run took first are skipped."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        rows = conn.execute(
+            f"SELECT id, message_id, recipient FROM outbox "
+            f"WHERE status = 'queued' AND next_attempt <= ? {scope} ORDER BY id LIMIT ?",
+            (time.time(), *params, limit),
+        ).fetchall()
+        now = time.time()
+        claimed = [r for r in rows if conn.execute(
+            "UPDATE outbox SET status = 'sending', claimed_at = ? WHERE id = ? AND status = 'queued'",
+            (now, r[0])).rowcount == 1]
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return claimed
+
+
+def deliver(message_id: int | None = None, budget_sec: float | None = None) -> dict:
+    """
+    Send every due outbox row (or only those of message_id). Failed rows stay
+    in the spool for the next call. With budget_sec, no new batch is claimed once
+    that many seconds have passed. Returns counts per outcome.
+    """
+    stats = {SENT: 0, RETRY: 0, FAILED: 0}
+    if not configured():
+        log.warning("SMTP not configured — mail left in spool.")
+        return stats
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    conn = _db()
+    throttle = Throttle(MAIL_RATE_PER_SEC)
+    workers = max(1, MAIL_POOL_SIZE)
+    scope, params = ("AND message_id = ?", (message_id,)) if message_id else ("", ())
+    deadline = time.monotonic() + budget_sec if budget_sec is not None else None
+    try:
+        with conn:
+            # Reclaim rows a crashed run left mid-send; prune old delivered rows
+            conn.execute("UPDATE outbox SET status = 'queued' WHERE status = 'sending' AND claimed_at < ?",
+                         (time.time() - SENDING_STALE_SEC,))
+            conn.execute("DELETE FROM outbox WHERE status = 'sent' AND sent_at < ?",
+                         (time.time() - MAIL_KEEP_DAYS * 86400,))
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mailer") as executor:
+            while deadline is None or time.monotonic() < deadline:
+                rows = _claim(conn, scope, params, MAIL_BATCH_SIZE * workers)
+                if not rows:
+                    break
+
+                ids = sorted({r[1] for r in rows})
+                messages = {
+                    m[0]: m[1:] for m in conn.execute(
+                        f"SELECT id, sender, subject, body, subtype FROM messages "
+                        f"WHERE id IN ({','.join('?' * len(ids))})", ids)
+                }
+                batches = [rows[i:i + MAIL_BATCH_SIZE] for i in range(0, len(rows), MAIL_BATCH_SIZE)]
+                for results in executor.map(lambda b: _send_batch(b, messages, throttle), batches):
+                    _record(conn, results, stats)
+    finally:
+        conn.close()
+
+    if any(stats.values()):
+        log.info(f"Mail delivered — {stats[SENT]} sent, {stats[RETRY]} to retry, {stats[FAILED]} failed")
+    return stats
+
+
+def _record(conn: sqlite3.Connection, results: list[tuple], stats: dict):
+    now = time.time()
+    with conn:
+        for row_id, outcome, error in results:
+            if outcome == SENT:
+                conn.execute("UPDATE outbox SET status = 'sent', sent_at = ?, last_error = NULL WHERE id = ?",
+                             (now, row_id))
+            else:
+                attempts = conn.execute("SELECT attempts FROM outbox WHERE id = ?", (row_id,)).fetchone()[0] + 1
+                if outcome == RETRY and attempts < MAIL_MAX_ATTEMPTS:
+                    conn.execute(
+                        "UPDATE outbox SET status = 'queued', attempts = ?, next_attempt = ?, last_error = ? "
+                        "WHERE id = ?",
+                        (attempts, now + MAIL_RETRY_BASE_SEC * 2 ** (attempts - 1), error, row_id))
+                else:
+                    outcome = FAILED
+                    conn.execute("UPDATE outbox SET status = 'failed', attempts = ?, last_error = ? WHERE id = ?",
+                                 (attempts, error, row_id))
+                    log.error(f"Mail to outbox #{row_id} failed for good: {error}")
+            stats[outcome] += 1
+
+
+def send(recipients: list[str], subject: str, body: str, subtype: str = "plain") -> dict:
+    """
+    Spool one message (alerts, reports) and deliver just that message. Returns its
+    recipients counted by outbox status: 'sent', 'queued' (left for a retry) or 'failed'.
+    """
+    message_id = enqueue(recipients, subject, body, subtype)
+    deliver(message_id)
+    conn = _db()
+    try:
+        rows = conn.execute("SELECT status, COUNT(*) FROM outbox WHERE message_id = ? GROUP BY status",
+                            (message_id,)).fetchall()
+    finally:
+        conn.close()
+    return dict(rows)
+
+
+if __name__ == "__main__":
+    setup_logging()
+    deliver()
@@ -5,40 +5,97 @@ Runs: scraper → summarizer → publisher → watchdog
 Usage:
   python main.py              # Full run
   python main.py --dry-run    # Scrape only, no HTML injection or alerts
+  python main.py --stream     # Scrape, summarise and publish concurrently
+  python main.py --daemon     # Stay running and poll each source on its own interval
+  python main.py --profile    # Full per-stage profile into logs/profiles/<run-id>/
+  python main.py --worker [--round ID]   # Sharded crawl: run several at once (same host or shared
+                                         # data volume); the last one to finish merges and publishes.
+                                         # Without --round, workers join the open round (a new one
+                                         # starts after each merge)
 """
 
 import sys
+import json
+import time
 import logging
-from pathlib import Path
-
-LOG_DIR = Path(__file__).resolve().parent.parent / "logs"
-LOG_DIR.mkdir(exist_ok=True)
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler(LOG_DIR / "pipeline.log"),
-        logging.StreamHandler()
-    ]
-)
+from contextlib import contextmanager, nullcontext
+
+from config import LOG_DIR, FRONTEND_DIR, setup_logging
+
 log = logging.getLogger("main")
 
 DRY_RUN = "--dry-run" in sys.argv
+STREAM  = "--stream" in sys.argv and not DRY_RUN
+DAEMON  = "--daemon" in sys.argv and not DRY_RUN
+PROFILE = "--profile" in sys.argv
+WORKER  = "--worker" in sys.argv and not (STREAM or DAEMON)
+ROUND   = sys.argv[sys.argv.index("--round") + 1] if "--round" in sys.argv[:-1] else None
+
+TIMINGS_FILE  = LOG_DIR / "last_run_timings.json"
+STAGE_TIMINGS = {}
+_profiler = None
+
+
+@contextmanager
+def stage(name: str):
+    """Time one pipeline stage; results land in logs/last_run_timings.json."""
+    started = time.perf_counter()
+    try:
+        with _profiler.stage(name) if _profiler else nullcontext():
+            yield
+    finally:
+        STAGE_TIMINGS[name] = round(time.perf_counter() - started, 3)
+        log.info(f"  ⏱ {name}: {STAGE_TIMINGS[name]:.2f}s")
+
+
+def save_timings(wall: float, failed: bool):
+    with open(TIMINGS_FILE, "w") as f:
+        json.dump({"wall": round(wall, 3), "stages": STAGE_TIMINGS, "failed": failed}, f, indent=2)
 
 
 def main():
+    if DAEMON:
+        log.info("SmartNRI Pipeline starting (DAEMON)")
+        from scheduler import run_forever
+        run_forever()
+        return
+
     log.info("=" * 60)
-    log.info(f"SmartNRI Pipeline starting {'(DRY RUN)' if DRY_RUN else ''}")
+    mode = "(DRY RUN)" if DRY_RUN else "(STREAMING)" if STREAM else f"(WORKER, round {ROUND or 'open'})" if WORKER else ""
+    log.info(f"SmartNRI Pipeline starting {mode}")
     log.info("=" * 60)
 
+    global _profiler
+    import profiling
+    _profiler = profiling.start(forced=PROFILE)
+
     pipeline_failed = False
+    shard_only = False
+    started = time.perf_counter()
 
     try:
+        if STREAM:
+            # Steps 1-3 overlap: items flow scraper → summariser → publisher as they complete
+            log.info("STEPS 1-3 — Streaming scraper → summariser → publisher")
+            with stage("stream"):
+                from streaming import run as stream
+                raw_count, summaries = stream()
+            log.info(f"  → {raw_count} new items fetched, {len(summaries)} summaries produced")
+            return
+
         # Step 1: Scrape
         log.info("STEP 1/3 — Scraper")
-        from scraper import run as scrape
-        raw_items = scrape()
+        with stage("scrape"):
+            if WORKER:
+                from scraper import run_worker
+                raw_items = run_worker(ROUND)
+            else:
+                from scraper import run as scrape
+                raw_items = scrape()
+        if raw_items is None:
+            log.info("Shard crawled — another worker merges and publishes this round.")
+            shard_only = True
+            return
         log.info(f"  → {len(raw_items)} new items fetched")
 
         if DRY_RUN:
@@ -49,7 +106,7 @@ def main():
             log.info("No new items — skipping summariser and publisher.")
             
             # Touch index.html to prevent watchdog from raising age alerts during slow news days
-            index_html = Path(__file__).resolve().parent.parent / "frontend" / "index.html"
+            index_html = FRONTEND_DIR / "index.html"
             if index_html.exists():
                 index_html.touch()
                 
@@ -59,28 +116,36 @@ def main():
 
         # Step 2: Summarise
         log.info("STEP 2/3 — Summariser")
-        from summarizer import run as summarise
-        summaries = summarise()
-        log.info(f"  → {len(summaries)} summaries produced")
+        with stage("summarise"):
+            from summarizer import run as summarise
+            summary_count = summarise()
+        log.info(f"  → {summary_count} summaries produced")
 
         # Step 3: Publish
         log.info("STEP 3/3 — Publisher")
-        from publisher import run as publish
-        publish()
+        with stage("publish"):
+            from publisher import run as publish
+            publish()
 
     except Exception as e:
         log.error(f"Pipeline FAILED: {e}", exc_info=True)
         pipeline_failed = True
 
     finally:
-        # Watchdog always runs
-        log.info("WATCHDOG — Health check")
-        from watchdog import run as watchdog
-        healthy = watchdog(pipeline_failed=pipeline_failed)
-        log.info(f"  → {'✅ Healthy' if healthy else '⚠️ Issues detected'}")
+        # Watchdog always runs (once per round in worker mode — on the merging worker)
+        if not shard_only or pipeline_failed:
+            log.info("WATCHDOG — Health check")
+            with stage("watchdog"):
+                from watchdog import run as watchdog
+                healthy = watchdog(pipeline_failed=pipeline_failed)
+            log.info(f"  → {'✅ Healthy' if healthy else '⚠️ Issues detected'}")
+        save_timings(time.perf_counter() - started, pipeline_failed)
+        if _profiler:
+            _profiler.close()
         log.info("Pipeline run complete.")
         sys.exit(1 if pipeline_failed else 0)
 
 
 if __name__ == "__main__":
+    setup_logging()
     main()
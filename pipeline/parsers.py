@@ -0,0 +1,154 @@
+"""
+parsers.py — SmartNRI Page Parsers
+Pure functions that turn a fetched page or feed into small item dicts.
+They hold the GIL for the whole BeautifulSoup parse, so they run in a process pool.
+
+Rules:
+- parse(source, body) depends only on its arguments — safe to run in any process
+- Only the extracted item dicts cross the process boundary, never parse trees
+- Max MAX_ITEMS_PER_SOURCE items per source
+- PARSE_WORKERS processes (default one per core), shared with PDF extraction (pdf_extract.py) so
+  CPU work never runs more processes than the host has cores; PARSE_WORKERS=0 runs it in the calling thread
+"""
+
+import os
+import time
+from concurrent.futures import Future
+from urllib.parse import urlparse
+
+import config  # noqa: F401 — loads .env before the getenv() calls below
+
+MAX_ITEMS_PER_SOURCE = 5
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(os.cpu_count() or 1)))
+
+_pool = None
+
+
+class ParseError(Exception):
+    """The page was fetched but could not be parsed — counts against the source's breaker."""
+
+
+def parse_html(source: dict, html_content: str | bytes) -> list[dict]:
+    """
+    Generic HTML scraper — extracts headings + paragraphs. Bytes (no charset in the
+    response headers) are decoded by BeautifulSoup from <meta charset>, else detected.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html_content, "html.parser")
+    items = []
+
+    # Specific: ESD / MOHA Table
+    if "esd.imi.gov.my" in source["url"]:
+        table = soup.find("table")
+        if table:
+            for row in table.find_all("tr")[1:MAX_ITEMS_PER_SOURCE+1]:  # skip header
+                cols = row.find_all("td")
+                if len(cols) >= 2:
+                    title = cols[1].get_text(strip=True)
+                    items.append({"title": title, "raw_text": title, "link": source["url"]})
+            if items: return items
+    
+    # Specific: HC KL Homepage
+    if "hcikl.gov.in" in source["url"]:
+        # Look for scrolling news or news links
+        for a in soup.find_all("a", href=True):
+            text = a.get_text(strip=True)
+            if len(text) > 30 and ("visa" in text.lower() or "consular" in text.lower() or "passport" in text.lower()):
+                items.append({"title": text, "raw_text": text, "link": a["href"]})
+        if items: return items[:MAX_ITEMS_PER_SOURCE]
+
+    # Generic: Try common patterns for gov announcement pages
+    candidates = (
+        soup.select("article") or
+        soup.select(".announcement, .news-item, .press-release, .update") or
+        soup.select("li.item, li.news") or
+        soup.select("tr") or  # Generic table rows
+        []
+    )
+
+    # Fallback: grab all headings with adjacent text
+    if not candidates:
+        for tag in soup.find_all(["h2", "h3", "h4"]):
+            text = tag.get_text(strip=True)
+            sibling = tag.find_next_sibling(["p", "div"])
+            body = sibling.get_text(strip=True) if sibling else ""
+            if len(text) > 20:
+                items.append({
+                    "title": text,
+                    "raw_text": body,
+                    "link": source["url"]
+                })
+        return items[:MAX_ITEMS_PER_SOURCE]
+
+    for el in candidates[:MAX_ITEMS_PER_SOURCE]:
+        title_tag = el.find(["h2", "h3", "h4", "a"])
+        title = title_tag.get_text(strip=True) if title_tag else el.get_text(strip=True)[:80]
+        link_tag = el.find("a", href=True)
+        link = link_tag["href"] if link_tag else source["url"]
+        if link.startswith("/"):
+            base = urlparse(source["url"])
+            link = f"{base.scheme}://{base.netloc}{link}"
+        body = el.get_text(separator=" ", strip=True)
+        # Text nodes let snapshots.py diff a large block line by line
+        items.append({"title": title, "raw_text": body, "link": link, "segments": list(el.stripped_strings)})
+
+    return items
+
+
+def parse_rss(source: dict, body: bytes) -> list[dict]:
+    """RSS/Atom feed scraper. Takes the undecoded feed, so feedparser honours its XML encoding."""
+    import feedparser
+    from bs4 import BeautifulSoup
+
+    feed = feedparser.parse(body)
+    if feed.bozo and not feed.entries:
+        raise ParseError(f"Feed unparseable: {feed.get('bozo_exception')}")
+    items = []
+    for entry in feed.entries[:MAX_ITEMS_PER_SOURCE]:
+        title = entry.get("title", "")
+        summary = entry.get("summary", entry.get("description", ""))
+        link = entry.get("link", source["url"])
+        published = entry.get("published_parsed") or entry.get("updated_parsed")
+        # Strip HTML tags from summary
+        clean = BeautifulSoup(summary, "html.parser").get_text(separator=" ", strip=True)
+        items.append({
+            "title": title,
+            "raw_text": clean,
+            "link": link,
+            "published": time.strftime("%Y-%m-%dT%H:%M:%S", published) if published else "",
+        })
+    return items
+
+
+def parse(source: dict, body: str | bytes) -> list[dict]:
+    if source["scrape_method"] == "rss":
+        return parse_rss(source, body)
+    return parse_html(source, body)
+
+
+def pool():
+    """The pipeline's CPU process pool, created on first use. Spawned, not forked — the pipeline has threads."""
+    global _pool
+    if _pool is None:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        _pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS or os.cpu_count() or 1, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def submit_task(fn, *args, workers: int | None = None) -> Future:
+    """Run a pure, picklable fn(*args) in the pool (or inline when PARSE_WORKERS=0). Returns its Future."""
+    if (PARSE_WORKERS if workers is None else workers) > 0:
+        return pool().submit(fn, *args)
+    future = Future()
+    try:
+        future.set_result(fn(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def submit(source: dict, body: str | bytes, workers: int | None = None) -> Future:
+    """Parse in the pool (or inline when PARSE_WORKERS=0). Returns a Future of the item list."""
+    return submit_task(parse, source, body, workers=workers)
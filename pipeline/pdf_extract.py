@@ -0,0 +1,132 @@
+"""
+pdf_extract.py — SmartNRI PDF Circular Ingestion
+Follows PDF links from listing rows (RBI, SEBI, CBDT circulars) so the LLM
+summarises the notice itself, not just its title.
+
+Rules:
+- Only for sources with "follow_pdfs": true in sources.json, and only for records that are new
+  or changed — the PDF text is attached after change detection (scraper.new_records), so it
+  never enters the content hash or snapshot; a failed fetch leaves the listing text alone
+- Only the first PDF_MAX_PAGES pages are read, stopping early at PDF_MAX_CHARS
+- Downloads are capped at PDF_MAX_BYTES
+- Extracted text is cached in data/pdf_cache/ by URL + ETag (or URL + content digest
+  when the server sends no ETag), so each PDF is parsed once
+- Parsing runs in the page parsers' process pool (parsers.py, PARSE_WORKERS) so it never
+  blocks fetching; needs pymupdf
+"""
+
+import os
+import hashlib
+import logging
+from urllib.parse import urljoin
+
+from config import DATA_DIR, HTTP_MODE
+import parsers
+
+log = logging.getLogger("pdf_extract")
+
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "3"))
+PDF_MAX_CHARS = int(os.getenv("PDF_MAX_CHARS", "3000"))
+PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", str(10 * 2**20)))
+PDF_CACHE_DIR = DATA_DIR / "pdf_cache"
+
+
+def extract_text(pdf_bytes: bytes, max_pages: int = PDF_MAX_PAGES, max_chars: int = PDF_MAX_CHARS) -> str:
+    """Pure, picklable worker: text of the first pages, stopping once max_chars is reached."""
+    import pymupdf
+
+    parts = []
+    total = 0
+    with pymupdf.open(stream=pdf_bytes, filetype="pdf") as doc:
+        for page in doc.pages(0, min(max_pages, doc.page_count)):
+            text = " ".join(page.get_text("text").split())
+            parts.append(text)
+            total += len(text)
+            if total >= max_chars:
+                break
+    return " ".join(parts)[:max_chars]
+
+
+def cache_path(url: str, version: str):
+    PDF_CACHE_DIR.mkdir(exist_ok=True)
+    key = hashlib.sha256(f"{url}|{version}".encode("utf-8")).hexdigest()[:32]
+    return PDF_CACHE_DIR / f"{key}.txt"
+
+
+def is_pdf_link(link: str) -> bool:
+    return ".pdf" in link.lower().split("?")[0]
+
+
+def fetch_pdf(session, url: str, headers: dict, timeout: int):
+    """
+    Returns ("cached", text) on an ETag cache hit without downloading the body,
+    ("bytes", (pdf_bytes, cache_file)) for a fresh download, or None on failure.
+    """
+    import requests
+
+    target = url
+    if HTTP_MODE == "replay":
+        import cassette
+        target = cassette.replay_url(url)
+    try:
+        with session.get(target, headers=headers, timeout=timeout, stream=True) as r:
+            r.raise_for_status()
+            etag = r.headers.get("ETag") or r.headers.get("Last-Modified")
+            if etag:
+                cached = cache_path(url, etag)
+                if cached.exists():
+                    return "cached", cached.read_text(encoding="utf-8")
+            body = bytearray()
+            for chunk in r.iter_content(chunk_size=64 * 1024):
+                body.extend(chunk)
+                if len(body) > PDF_MAX_BYTES:
+                    log.warning(f"  PDF over {PDF_MAX_BYTES} bytes, skipped: {url}")
+                    return None
+    except requests.RequestException as e:
+        log.error(f"PDF GET failed for {url}: {e}")
+        return None
+
+    body = bytes(body)
+    if HTTP_MODE == "record":
+        import cassette
+        cassette.record(url, body, 200, "application/pdf")
+    version = etag or hashlib.sha256(body).hexdigest()
+    cached = cache_path(url, version)
+    if cached.exists():
+        return "cached", cached.read_text(encoding="utf-8")
+    return "bytes", (body, cached)
+
+
+def append_text(record: dict, text: str):
+    record["raw_text"] = f"{record['raw_text']}\n\n{text}".strip()
+
+
+def enrich(records: list[dict], source: dict, session, headers: dict, timeout: int) -> list[dict]:
+    """Append extracted PDF text to every record whose link points at a PDF."""
+    pending = []
+    for record in records:
+        link = urljoin(source["url"], record["source_url"])
+        if not is_pdf_link(link):
+            continue
+        fetched = fetch_pdf(session, link, headers, timeout)
+        if not fetched:
+            continue
+        kind, payload = fetched
+        if kind == "cached":
+            log.info(f"  PDF cache hit: {link}")
+            append_text(record, payload)
+        else:
+            body, cached = payload
+            # Keep fetching the next PDF while this one parses in another process
+            pending.append((record, link, cached, parsers.submit_task(extract_text, body)))
+
+    for record, link, cached, future in pending:
+        try:
+            text = future.result()
+        except Exception as e:
+            log.error(f"PDF extraction failed for {link}: {e}")
+            continue
+        cached.write_text(text, encoding="utf-8")
+        log.info(f"  PDF extracted ({len(text)} chars): {link}")
+        append_text(record, text)
+    return records
@@ -0,0 +1,173 @@
+"""
+profiling.py — SmartNRI Run Profiler
+Profiles each pipeline stage so a slow run can be pinned on parsing, Playwright,
+the LLM or the HTML rewrite.
+
+Modes:
+- Full (main.py --profile): cProfile + tracemalloc + stack sampling per stage; page parsing and
+  PDF extraction run in the calling thread (PARSE_WORKERS=0) so their cost shows up in the profile
+- Sampled (PROFILE_SAMPLE_RATE, e.g. 0.05): stack sampling only — cheap enough for production;
+  parsing stays in the process pool, which the sampler cannot see (noted in summary.json)
+
+Output: logs/profiles/<run-id>/
+- <stage>.pstats     — cProfile stats (snakeviz, gprof2dot, flameprof)       [full]
+- <stage>.top.txt    — top functions by cumulative time                      [full]
+- <stage>.alloc.txt  — top allocation sites by size                          [full]
+- <stage>.folded     — collapsed stacks, one "frame;frame;frame count" per line
+                       (flamegraph.pl, speedscope, inferno)
+- summary.json       — wall time, samples and peak traced memory per stage
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import random
+import logging
+import datetime
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from config import LOG_DIR
+
+if TYPE_CHECKING:
+    import cProfile
+
+PROFILES_DIR = LOG_DIR / "profiles"
+
+log = logging.getLogger("profiling")
+
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+SAMPLE_INTERVAL_MS  = float(os.getenv("PROFILE_INTERVAL_MS", "10"))
+TRACEMALLOC_FRAMES  = int(os.getenv("PROFILE_TRACEMALLOC_FRAMES", "1"))
+TOP_N               = 25
+
+
+class StackSampler:
+    """Background thread that samples every thread's Python stack at a fixed interval."""
+
+    def __init__(self, interval_ms: float = SAMPLE_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._loop, name="profiler-sampler", daemon=True)
+
+    def _loop(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for t in threading.enumerate():
+                names[t.ident] = t.name
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, frame in frames.items():
+                    if ident == own:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        code = frame.f_code
+                        stack.append(f"{Path(code.co_filename).stem}:{code.co_name}")
+                        frame = frame.f_back
+                    stack.append(names.get(ident, str(ident)))
+                    self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def drain(self) -> Counter:
+        """Return and reset the stacks collected so far."""
+        with self._lock:
+            stacks, self.stacks = self.stacks, Counter()
+        return stacks
+
+
+class Profiler:
+    def __init__(self, detailed: bool):
+        self.detailed = detailed
+        self.run_id = f"{datetime.datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}"
+        self.out_dir = PROFILES_DIR / self.run_id
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.summary: dict = {"run_id": self.run_id, "detailed": detailed, "stages": {}}
+        import parsers
+        if detailed:
+            parsers.PARSE_WORKERS = 0  # child processes are invisible to cProfile and tracemalloc
+        elif parsers.PARSE_WORKERS:
+            self.summary["note"] = "page parsing ran in the process pool and is not included"
+        self.sampler = StackSampler()
+        self.sampler.start()
+        if detailed and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        log.info(f"Profiling {'(full)' if detailed else '(sampled)'} → {self.out_dir}")
+
+    @contextmanager
+    def stage(self, name: str):
+        import cProfile
+
+        self.sampler.drain()  # drop samples taken between stages
+        prof = cProfile.Profile() if self.detailed else None
+        if self.detailed:
+            tracemalloc.reset_peak()
+            before = tracemalloc.take_snapshot()
+            prof.enable()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - started
+            stacks = self.sampler.drain()  # before our own post-processing pollutes the samples
+            stats = {"wall": round(wall, 3)}
+            if self.detailed:
+                prof.disable()
+                # Snapshot before writing any report, so pstats' own allocations aren't counted
+                after = tracemalloc.take_snapshot()
+                stats["peak_traced_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+                self._write_allocations(name, after.compare_to(before, "lineno"))
+                self._write_cprofile(name, prof)
+            stats["samples"] = self._write_folded(name, stacks)
+            self.summary["stages"][name] = stats
+
+    def _write_cprofile(self, name: str, prof: "cProfile.Profile"):
+        import pstats
+
+        prof.dump_stats(self.out_dir / f"{name}.pstats")
+        buf = io.StringIO()
+        pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(TOP_N)
+        (self.out_dir / f"{name}.top.txt").write_text(buf.getvalue())
+
+    def _write_allocations(self, name: str, diff: list):
+        lines = [f"{stat.size_diff / 1024:>10.1f} KiB  {stat.count_diff:>8} blocks  {stat.traceback}"
+                 for stat in diff[:TOP_N]]
+        (self.out_dir / f"{name}.alloc.txt").write_text("\n".join(lines) + "\n")
+
+    def _write_folded(self, name: str, stacks: Counter) -> int:
+        with open(self.out_dir / f"{name}.folded", "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return sum(stacks.values())
+
+    def close(self):
+        self.sampler.stop()
+        if self.detailed:
+            tracemalloc.stop()
+        with open(self.out_dir / "summary.json", "w") as f:
+            json.dump(self.summary, f, indent=2)
+        log.info(f"Profile written to {self.out_dir}")
+
+
+def start(forced: bool) -> Profiler | None:
+    """Full profile when forced (--profile), a cheap sampled profile for PROFILE_SAMPLE_RATE of runs."""
+    if forced:
+        return Profiler(detailed=True)
+    if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+        return Profiler(detailed=False)
+    return None
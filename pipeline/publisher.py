@@ -1,37 +1,23 @@
 """
 publisher.py — SmartNRI HTML Injector + Telegram Alert
-Reads summaries.json, injects cards into index.html, and sends Telegram alerts for RED items.
+Reads summaries.ndjson, injects cards into index.html, and sends Telegram alerts for RED items.
+Every update also gets a permanent static page (static_pages.py), linked from its card.
+`--follow` tails the summariser's stream and sends each RED alert as soon as its summary lands.
 """
 
 import os
-import json
+import sys
 import logging
 import datetime
 import re
-from pathlib import Path
 
-import requests
-from dotenv import load_dotenv
+from config import DATA_DIR, FRONTEND_DIR, setup_logging
+import artifacts
+import static_pages
 
-load_dotenv()
-
-BASE_DIR      = Path(__file__).resolve().parent.parent
-DATA_DIR      = BASE_DIR / "data"
-LOG_DIR       = BASE_DIR / "logs"
-FRONTEND_DIR  = BASE_DIR / "frontend"
 SUMMARIES_IN  = DATA_DIR / "summaries.json"
 INDEX_HTML    = FRONTEND_DIR / "index.html"
 
-LOG_DIR.mkdir(exist_ok=True)
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler(LOG_DIR / "pipeline.log"),
-        logging.StreamHandler()
-    ]
-)
 log = logging.getLogger("publisher")
 
 TELEGRAM_TOKEN   = os.getenv("TELEGRAM_BOT_TOKEN", "")
@@ -67,7 +53,7 @@ def build_card(item: dict, delay_index: int) -> str:
           <div class="card-badge {badge_cls}">&#9679; {badge_label}</div>
           <div class="card-date">{item['date']}</div>
         </div>
-        <h3 class="card-title">{item['title']}</h3>
+        <h3 class="card-title"><a href="/{static_pages.update_path(item['id'])}" style="color:inherit;text-decoration:none">{item['title']}</a></h3>
         <p class="card-summary">{item['so_what']}</p>
         <div class="card-key-points">
           <h4>Key Points</h4>
@@ -128,6 +114,7 @@ def send_telegram(message: str):
     if not TELEGRAM_TOKEN or not TELEGRAM_CHAT_ID:
         log.warning("Telegram not configured — skipping alert.")
         return
+    import requests
     url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
     payload = {
         "chat_id": TELEGRAM_CHAT_ID,
@@ -170,14 +157,15 @@ def send_weekly_digest(summaries: list[dict]):
 
 # ── Main ───────────────────────────────────────────────────────────────
 
-def run():
-    if not SUMMARIES_IN.exists():
-        log.warning("summaries.json not found — nothing to publish.")
-        return
+def send_red_alerts(summaries: list[dict]) -> int:
+    """Send a Telegram alert for every RED item. Returns the number sent."""
+    red_items = [s for s in summaries if s["badge"] == "RED"]
+    for item in red_items:
+        send_telegram(format_telegram_alert(item))
+    return len(red_items)
 
-    with open(SUMMARIES_IN) as f:
-        summaries = json.load(f)
 
+def publish(summaries: list[dict], send_alerts: bool = True):
     if not summaries:
         log.info("No summaries to publish.")
         if INDEX_HTML.exists():
@@ -187,13 +175,32 @@ def run():
     # Inject into HTML
     inject_into_html(summaries)
 
+    # Permanent pages, listings and sitemap — only new/changed updates are rendered
+    static_pages.build(summaries)
+
     # Send Telegram alerts for RED items
-    red_items = [s for s in summaries if s["badge"] == "RED"]
-    for item in red_items:
-        send_telegram(format_telegram_alert(item))
+    red_count = send_red_alerts(summaries) if send_alerts else 0
+
+    log.info(f"Publisher done — {len(summaries)} published, {red_count} RED alerts sent.")
+
+
+def run(follow: bool = False):
+    if follow:
+        summaries = []
+        for summary in artifacts.follow(artifacts.SUMMARIES_STREAM, artifacts.Summary):
+            summaries.append(summary)
+            if summary.badge == "RED":
+                send_telegram(format_telegram_alert(summary))
+        publish(summaries, send_alerts=False)
+        return
+
+    if not artifacts.exists(artifacts.SUMMARIES_STREAM, legacy=SUMMARIES_IN):
+        log.warning("summaries.ndjson not found — nothing to publish.")
+        return
 
-    log.info(f"Publisher done — {len(summaries)} published, {len(red_items)} RED alerts sent.")
+    publish(list(artifacts.read(artifacts.SUMMARIES_STREAM, artifacts.Summary, legacy=SUMMARIES_IN)))
 
 
 if __name__ == "__main__":
-    run()
+    setup_logging()
+    run(follow="--follow" in sys.argv)
@@ -0,0 +1,222 @@
+"""
+scheduler.py — SmartNRI Polling Daemon
+Keeps the pipeline process (and its HTTP connections) alive and polls each source
+on its own adaptive interval instead of a single cron tick for everything.
+
+Rules:
+- Every active source in sources.json gets its own next-run time
+- A poll that finds new items halves the interval (down to the source's minimum)
+- A poll with no change stretches the interval by SCHEDULER_BACKOFF (up to the maximum)
+- Candidates from every source polled in a tick compete for one LLM_BUDGET (selector.py)
+- A failed poll backs off exponentially on consecutive failures (up to the maximum)
+- Every interval gets ±SCHEDULER_JITTER so sources never poll in lockstep
+- Bounds come from SCHEDULER_MIN/MAX_INTERVAL_MIN, overridable per source with
+  "min_interval_minutes" / "max_interval_minutes"
+- State persists in data/schedule_state.json, so restarts keep learned intervals
+- The watchdog runs at most once per WATCHDOG_INTERVAL_MIN, so a lasting condition (source down,
+  stale index) alerts once per interval instead of every tick; failed ticks in between are reported then
+"""
+
+import os
+import json
+import time
+import itertools
+import random
+import signal
+import logging
+import threading
+
+from config import DATA_DIR, setup_logging
+
+STATE_FILE  = DATA_DIR / "schedule_state.json"
+
+log = logging.getLogger("scheduler")
+
+MIN_INTERVAL_MIN = float(os.getenv("SCHEDULER_MIN_INTERVAL_MIN", "15"))
+MAX_INTERVAL_MIN = float(os.getenv("SCHEDULER_MAX_INTERVAL_MIN", "1440"))
+START_INTERVAL_MIN = float(os.getenv("SCHEDULER_START_INTERVAL_MIN", "60"))
+BACKOFF          = float(os.getenv("SCHEDULER_BACKOFF", "1.5"))
+JITTER           = float(os.getenv("SCHEDULER_JITTER", "0.1"))
+WATCHDOG_INTERVAL_MIN = float(os.getenv("WATCHDOG_INTERVAL_MIN", "60"))
+MAX_SLEEP_SEC    = 60   # re-check sources.json / shutdown at least this often
+KEEP_SUMMARIES   = 20   # rolling window of summaries kept for the homepage
+
+
+# ── State ──────────────────────────────────────────────────────────────
+
+def load_state() -> dict:
+    if STATE_FILE.exists():
+        with open(STATE_FILE) as f:
+            return json.load(f)
+    return {}
+
+
+def save_state(state: dict):
+    tmp = STATE_FILE.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2)
+    tmp.replace(STATE_FILE)
+
+
+def bounds(source: dict) -> tuple[float, float]:
+    lo = float(source.get("min_interval_minutes", MIN_INTERVAL_MIN))
+    hi = float(source.get("max_interval_minutes", MAX_INTERVAL_MIN))
+    return lo, max(lo, hi)
+
+
+def next_interval(source: dict, entry: dict, changed: bool, failed: bool) -> float:
+    """Adapt a source's polling interval (minutes) from the outcome of its last poll."""
+    lo, hi = bounds(source)
+    interval = entry.get("interval_min", START_INTERVAL_MIN)
+    if failed:
+        interval = interval * (2 ** min(entry.get("failures", 1), 5))
+    elif changed:
+        interval = interval / 2
+    else:
+        interval = interval * BACKOFF
+    return min(hi, max(lo, interval))
+
+
+def jittered(minutes: float) -> float:
+    """Seconds until the next poll, with ±JITTER spread."""
+    return minutes * 60 * (1 + random.uniform(-JITTER, JITTER))
+
+
+# ── Polling ────────────────────────────────────────────────────────────
+
+def poll(source: dict, hash_cache: dict) -> tuple[dict[str, dict], bool]:
+    """Fetch one source and return (new candidates by cache key, failed)."""
+    import scraper
+    import source_health
+
+    log.info(f"Polling: {source['name']} ({source['url']})")
+    raw_items = scraper.fetch_source(source)
+    if not raw_items:
+        log.warning(f"No items found for {source['name']}")
+        health = source_health.load_health().get(source["id"], {})
+        return {}, health.get("consecutive_failures", 0) > 0
+    return dict(scraper.new_records(source, raw_items, hash_cache)), False
+
+
+def select(candidates: dict[str, dict], hash_cache: dict) -> list[dict]:
+    """Pick the tick's records across every polled source, so LLM_BUDGET is global per tick."""
+    import scraper
+    import selector
+    import snapshots
+
+    new_hashes = dict(hash_cache)
+    records = selector.select(list(candidates.values())) if candidates else []
+    scraper.accept(candidates, records, new_hashes)
+    if records or scraper.settled:
+        scraper.save_hash_cache(new_hashes)
+    snapshots.save()  # also keeps baselines seeded for unchanged items
+    return records
+
+
+def process(records: list[dict]):
+    """Summarise and publish a tick's new records on top of the previous summaries."""
+    import artifacts
+    import scraper
+    import summarizer
+    import publisher
+
+    artifacts.write(artifacts.RAW_STREAM, "raw_content", records)
+    artifacts.to_json(artifacts.RAW_STREAM, scraper.RAW_OUTPUT)
+
+    fresh = [s for s in (summarizer.summarise(r) for r in records) if s]
+
+    seen = {s["id"] for s in fresh}
+    previous = artifacts.read(artifacts.SUMMARIES_STREAM, artifacts.Summary, legacy=summarizer.SUMMARIES_OUT)
+    kept = itertools.islice((s for s in previous if s["id"] not in seen), max(0, KEEP_SUMMARIES - len(fresh)))
+    summaries = (fresh + list(kept))[:KEEP_SUMMARIES]
+    summarizer.save_summaries(summaries)
+
+    if fresh:
+        publisher.inject_into_html(summaries)
+        publisher.static_pages.build(fresh)
+        publisher.send_red_alerts(fresh)
+    log.info(f"Tick published {len(fresh)} new summaries")
+
+
+def tick(sources: list[dict], state: dict, now: float) -> tuple[list[dict], int]:
+    """Poll every due source once, then select across all of them. Returns (new records, sources polled)."""
+    import scraper
+
+    hash_cache = scraper.load_hash_cache()
+    candidates: dict[str, dict] = {}
+    polled = 0
+    for source in sources:
+        entry = state.setdefault(source["id"], {"interval_min": START_INTERVAL_MIN, "failures": 0})
+        if entry.get("next_run", 0) > now:
+            continue
+
+        polled += 1
+        try:
+            found, failed = poll(source, hash_cache)
+        except Exception as e:
+            log.error(f"Poll failed for {source['id']}: {e}")
+            found, failed = {}, True
+
+        entry["failures"] = entry.get("failures", 0) + 1 if failed else 0
+        entry["interval_min"] = next_interval(source, entry, bool(found), failed)
+        entry["last_run"] = now
+        if found:
+            entry["last_change"] = now
+        entry["next_run"] = time.time() + jittered(entry["interval_min"])
+        log.info(f"  {source['id']}: {len(found)} new, next poll in {entry['interval_min']:.0f} min")
+        candidates.update(found)
+
+    if not polled:
+        return [], 0
+    return select(candidates, hash_cache), polled
+
+
+def run_forever():
+    import scraper
+    import publisher
+    from watchdog import run as watchdog
+
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+
+    state = load_state()
+    last_watchdog = None
+    unreported_failure = False
+    log.info(f"Scheduler started — intervals {MIN_INTERVAL_MIN:.0f}–{MAX_INTERVAL_MIN:.0f} min")
+
+    while not stop.is_set():
+        sources = scraper.load_sources()  # re-read so config edits apply without restart
+        now = time.time()
+        failed = False
+        records, polled = tick(sources, state, now)
+        save_state(state)
+
+        if records:
+            try:
+                process(records)
+            except Exception as e:
+                log.error(f"Tick FAILED: {e}", exc_info=True)
+                failed = True
+        elif polled and publisher.INDEX_HTML.exists():
+            # Quiet tick — keep the watchdog's index age check from firing
+            publisher.INDEX_HTML.touch()
+
+        unreported_failure = unreported_failure or failed
+        watchdog_due = last_watchdog is None or time.monotonic() - last_watchdog >= WATCHDOG_INTERVAL_MIN * 60
+        if polled and watchdog_due:
+            watchdog(pipeline_failed=unreported_failure)
+            last_watchdog = time.monotonic()
+            unreported_failure = False
+
+        active = {s["id"] for s in sources}
+        due = [e["next_run"] for k, e in state.items() if k in active and "next_run" in e]
+        wait = min(due, default=now + MAX_SLEEP_SEC) - time.time()
+        stop.wait(max(1.0, min(wait, MAX_SLEEP_SEC)))
+
+    log.info("Scheduler stopped.")
+
+
+if __name__ == "__main__":
+    setup_logging()
+    run_forever()
@@ -1,13 +1,21 @@
 """
 scraper.py — SmartNRI Data Fetcher
 Fetches content from whitelisted Tier 1 government sources.
-Outputs: data/raw_content.json
+Outputs: data/raw_content.ndjson (+ raw_content.json for batch consumers)
 
 Rules:
 - Only fetch from sources listed in sources.json
 - Skip if content hash unchanged since last run
-- Max 5 new items per run
+- A changed item sends only its changed lines to the LLM (snapshots.py); the diff is kept on the record
+- Hashes and diffs cover the listing row only; linked PDFs ("follow_pdfs") are fetched for new or
+  changed items afterwards, so an unchanged row never re-downloads its PDF and a failed PDF
+  fetch cannot look like a change
+- Max 5 items parsed per source (parsers.py); selector.py picks which new items reach the LLM
 - Log all errors to logs/scraper_errors.log
+- Fetches are streamed: capped at MAX_FETCH_BYTES (or the source's "max_bytes"),
+  limited to HTML/XML content types, and can stop early at a source's "stop_after" marker
+- Worker mode (run_worker): sources are leased one at a time (leases.py); each worker appends
+  its candidates to data/shards/<round>/<worker>.jsonl and one worker merges them per round
 """
 
 import os
@@ -16,40 +24,37 @@ import hashlib
 import logging
 import datetime
 import time
-from pathlib import Path
 
-import requests
-import feedparser
-from bs4 import BeautifulSoup
-from dotenv import load_dotenv
+from config import DATA_DIR, PIPELINE_DIR, HTTP_MODE, setup_logging
+import artifacts
+import parsers
+import selector
+import snapshots
+import source_health
 
-load_dotenv()
+# requests and cassette are imported where they are used (bs4/feedparser live in parsers.py),
+# so importing this module (or running publish-only) stays cheap.
 
 # ── Paths ──────────────────────────────────────────────────────────────
-BASE_DIR   = Path(__file__).resolve().parent.parent
-DATA_DIR   = BASE_DIR / "data"
-LOG_DIR    = BASE_DIR / "logs"
-SOURCES_FILE   = Path(__file__).resolve().parent / "sources.json"
+SOURCES_FILE   = PIPELINE_DIR / "sources.json"
 RAW_OUTPUT     = DATA_DIR / "raw_content.json"
 HASH_CACHE     = DATA_DIR / "content_hashes.json"
+SHARD_DIR      = DATA_DIR / "shards"
 
-DATA_DIR.mkdir(exist_ok=True)
-LOG_DIR.mkdir(exist_ok=True)
-
-# ── Logging ────────────────────────────────────────────────────────────
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler(LOG_DIR / "scraper_errors.log"),
-        logging.StreamHandler()
-    ]
-)
 log = logging.getLogger("scraper")
 
+settled: dict[str, str] = {}  # cache_key → new hash of a removal-only change, saved with the next hash cache
+
 # ── Constants ──────────────────────────────────────────────────────────
-MAX_ITEMS    = 5
 REQUEST_TIMEOUT = 15
+MAX_FETCH_BYTES = int(os.getenv("MAX_FETCH_BYTES", str(2 * 2**20)))
+CHUNK_SIZE   = 16 * 1024
+ALLOWED_CONTENT_TYPES = (
+    "text/html", "application/xhtml+xml", "text/xml",
+    "application/xml", "application/rss+xml", "application/atom+xml",
+)
+CRAWL_DELAY  = float(os.getenv("CRAWL_DELAY", "1"))
+MAX_RAW_CHARS = 3000  # per item sent to the LLM
 HEADERS = {
     "User-Agent": (
         "Mozilla/5.0 (compatible; SmartNRI-Bot/1.0; "
@@ -60,6 +65,10 @@ HEADERS = {
 
 # ── Helpers ────────────────────────────────────────────────────────────
 
+class FetchError(Exception):
+    """The source could not be reached — counts against its circuit breaker."""
+
+
 def load_sources() -> list:
     with open(SOURCES_FILE) as f:
         return [s for s in json.load(f) if s.get("active")]
@@ -73,8 +82,13 @@ def load_hash_cache() -> dict:
 
 
 def save_hash_cache(cache: dict):
-    with open(HASH_CACHE, "w") as f:
+    """Atomic write; also folds in hashes settled without an LLM call (see build_record)."""
+    cache.update(settled)
+    settled.clear()
+    tmp = HASH_CACHE.with_suffix(".tmp")
+    with open(tmp, "w") as f:
         json.dump(cache, f, indent=2)
+    tmp.replace(HASH_CACHE)
 
 
 def hash_content(text: str) -> str:
@@ -83,20 +97,21 @@ def hash_content(text: str) -> str:
 
 # ── Session & Retry ───────────────────────────────────────────────────
 
-class LegacySSLAdapter(requests.adapters.HTTPAdapter):
-    """Custom adapter to handle 'Unsafe Legacy Renegotiation Disabled' errors."""
-    def init_poolmanager(self, *args, **kwargs):
-        import ssl
-        ctx = ssl.create_default_context()
-        ctx.set_ciphers('DEFAULT@SECLEVEL=1')
-        ctx.options |= 0x4  # OP_LEGACY_SERVER_CONNECT
-        kwargs['ssl_context'] = ctx
-        return super().init_poolmanager(*args, **kwargs)
-
 def get_session():
+    import requests
     from urllib3.util.retry import Retry
     from requests.adapters import HTTPAdapter
-    
+
+    class LegacySSLAdapter(HTTPAdapter):
+        """Custom adapter to handle 'Unsafe Legacy Renegotiation Disabled' errors."""
+        def init_poolmanager(self, *args, **kwargs):
+            import ssl
+            ctx = ssl.create_default_context()
+            ctx.set_ciphers('DEFAULT@SECLEVEL=1')
+            ctx.options |= 0x4  # OP_LEGACY_SERVER_CONNECT
+            kwargs['ssl_context'] = ctx
+            return super().init_poolmanager(*args, **kwargs)
+
     session = requests.Session()
     retry_strategy = Retry(
         total=3,
@@ -114,16 +129,102 @@ def get_session():
     
     return session
 
-_session = get_session()
+_session = None
+
+
+def session():
+    """Shared HTTP session, built on first use and kept warm afterwards."""
+    global _session
+    if _session is None:
+        _session = get_session()
+    return _session
+
+
+def read_bounded(r, url: str, max_bytes: int, stop_after: str = "") -> bytes:
+    """
+    Read a streamed response chunk by chunk. Stops at max_bytes, or as soon as
+    the stop_after marker has been seen, so large pages are never fully buffered.
+    """
+    marker = stop_after.encode("utf-8")
+    parts = []
+    received = 0
+    for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+        received += len(chunk)
+        if received > max_bytes:
+            chunk = chunk[:len(chunk) - (received - max_bytes)]
+        parts.append(chunk)
+        if marker:
+            # Only the new chunk plus a marker-sized overlap can contain a fresh match
+            window = (parts[-2][-len(marker):] if len(parts) > 1 else b"") + chunk
+            if marker in window:
+                log.info(f"  Early stop after {received} bytes for {url}")
+                break
+        if received >= max_bytes:
+            log.warning(f"  Truncated {url} at {max_bytes} bytes")
+            break
+    return b"".join(parts)
+
 
-def safe_get(url: str) -> requests.Response | None:
+def decode_body(r, body: bytes) -> str | bytes:
+    """
+    Decode with the charset from Content-Type. Without one (or with an unknown one) the
+    bytes are returned as-is: BeautifulSoup reads <meta charset> in the parse pool and only
+    guesses after that, so no detection runs over the page on the scraper thread.
+    """
+    if "charset=" in r.headers.get("Content-Type", "").lower():
+        try:
+            return body.decode(r.encoding, errors="replace")
+        except LookupError:
+            log.warning(f"Unknown charset {r.encoding!r} for {r.url} — leaving it to the parser")
+    return body
+
+
+def safe_get(url: str, source: dict | None = None, raw: bool = False) -> str | bytes | None:
+    """
+    Fetch a URL with a size cap and content-type allow-list. Returns text when the
+    response names its charset, otherwise the undecoded bytes (see decode_body); always
+    bytes with raw=True (feeds: feedparser reads the XML prolog's encoding).
+    Per-source overrides: "max_bytes", "content_types", "stop_after".
+    Raises FetchError on transport errors and 5xx/429 (the host is down or shedding load);
+    returns None when the host answered with something we won't use (other 4xx, wrong type).
+    """
+    import requests
+
+    source = source or {}
+    max_bytes = source.get("max_bytes", MAX_FETCH_BYTES)
+    allowed = tuple(source.get("content_types", ALLOWED_CONTENT_TYPES))
+
+    target = url
+    if HTTP_MODE == "replay":
+        import cassette
+        target = cassette.replay_url(url)
     try:
-        r = _session.get(url, headers=HEADERS, timeout=REQUEST_TIMEOUT)
-        r.raise_for_status()
-        return r
-    except requests.RequestException as e:
+        with session().get(target, headers=HEADERS, timeout=REQUEST_TIMEOUT, stream=True) as r:
+            r.raise_for_status()
+            content_type = r.headers.get("Content-Type", "text/html")
+            if not content_type.split(";")[0].strip().lower().startswith(allowed):
+                log.error(f"GET skipped for {url}: content type {content_type} not allowed")
+                return None
+            body = read_bounded(r, url, max_bytes, source.get("stop_after", ""))
+            text = body if raw else decode_body(r, body)
+
+        if HTTP_MODE == "record":
+            import cassette
+            if isinstance(text, bytes):
+                cassette.record(url, body, r.status_code, content_type)
+            else:
+                mime = content_type.split(";")[0].strip()
+                cassette.record(url, text.encode("utf-8"), r.status_code, f"{mime}; charset=utf-8")
+        return text
+    except requests.HTTPError as e:
+        status = e.response.status_code
         log.error(f"GET failed for {url}: {e}")
+        if status >= 500 or status == 429:
+            raise FetchError(str(e)) from e
         return None
+    except requests.RequestException as e:
+        log.error(f"GET failed for {url}: {e}")
+        raise FetchError(str(e)) from e
 
 
 def slugify(text: str) -> str:
@@ -137,179 +238,378 @@ def slugify(text: str) -> str:
 
 # ── Scrapers ───────────────────────────────────────────────────────────
 
-def scrape_html(source: dict) -> list[dict]:
-    """Generic HTML scraper — extracts headings + paragraphs."""
-    if "incometaxindia.gov.in" in source["url"]:
+def fetch_html(source: dict) -> str | bytes | None:
+    """Fetch a source's HTML — through Playwright for JavaScript-rendered sites."""
+    # Replay serves the recorded Playwright page through safe_get
+    if "incometaxindia.gov.in" in source["url"] and HTTP_MODE != "replay":
         try:
             from playwright.sync_api import sync_playwright
             with sync_playwright() as p:
                 browser = p.chromium.launch(headless=True)
                 page = browser.new_page()
                 page.goto(source["url"], timeout=60000, wait_until="networkidle")
-                html_content = page.content()
+                html_content = page.content()[:source.get("max_bytes", MAX_FETCH_BYTES)]
                 browser.close()
-            soup = BeautifulSoup(html_content, "html.parser")
-        except ImportError:
+            if HTTP_MODE == "record":
+                import cassette
+                cassette.record(source["url"], html_content.encode("utf-8"))
+            return html_content
+        except ImportError as e:
             log.error("Playwright not installed. Skipping incometaxindia.")
-            return []
+            raise FetchError("Playwright not installed") from e
         except Exception as e:
             log.error(f"Playwright failed for {source['url']}: {e}")
-            return []
-    else:
-        resp = safe_get(source["url"])
-        if not resp:
-            return []
-        soup = BeautifulSoup(resp.text, "html.parser")
-    items = []
-
-    # Specific: ESD / MOHA Table
-    if "esd.imi.gov.my" in source["url"]:
-        table = soup.find("table")
-        if table:
-            for row in table.find_all("tr")[1:MAX_ITEMS+1]:  # skip header
-                cols = row.find_all("td")
-                if len(cols) >= 2:
-                    title = cols[1].get_text(strip=True)
-                    items.append({"title": title, "raw_text": title, "link": source["url"]})
-            if items: return items
-    
-    # Specific: HC KL Homepage
-    if "hcikl.gov.in" in source["url"]:
-        # Look for scrolling news or news links
-        for a in soup.find_all("a", href=True):
-            text = a.get_text(strip=True)
-            if len(text) > 30 and ("visa" in text.lower() or "consular" in text.lower() or "passport" in text.lower()):
-                items.append({"title": text, "raw_text": text, "link": a["href"]})
-        if items: return items[:MAX_ITEMS]
-
-    # Generic: Try common patterns for gov announcement pages
-    candidates = (
-        soup.select("article") or
-        soup.select(".announcement, .news-item, .press-release, .update") or
-        soup.select("li.item, li.news") or
-        soup.select("tr") or  # Generic table rows
-        []
-    )
+            raise FetchError(str(e)) from e
 
-    # Fallback: grab all headings with adjacent text
-    if not candidates:
-        for tag in soup.find_all(["h2", "h3", "h4"]):
-            text = tag.get_text(strip=True)
-            sibling = tag.find_next_sibling(["p", "div"])
-            body = sibling.get_text(strip=True) if sibling else ""
-            if len(text) > 20:
-                items.append({
-                    "title": text,
-                    "raw_text": body,
-                    "link": source["url"]
-                })
-        return items[:MAX_ITEMS]
-
-    for el in candidates[:MAX_ITEMS]:
-        title_tag = el.find(["h2", "h3", "h4", "a"])
-        title = title_tag.get_text(strip=True) if title_tag else el.get_text(strip=True)[:80]
-        link_tag = el.find("a", href=True)
-        link = link_tag["href"] if link_tag else source["url"]
-        if link.startswith("/"):
-            from urllib.parse import urlparse
-            base = urlparse(source["url"])
-            link = f"{base.scheme}://{base.netloc}{link}"
-        body = el.get_text(separator=" ", strip=True)
-        items.append({"title": title, "raw_text": body, "link": link})
+    return safe_get(source["url"], source)
 
-    return items
 
+def fetch_rss(source: dict) -> bytes | None:
+    """Fetch a feed through safe_get so feeds share retries, timeouts and record/replay."""
+    return safe_get(source["url"], source, raw=True)
+
+
+# ── Main ───────────────────────────────────────────────────────────────
+
+JUNK_KEYWORDS = ["contact", "representative", "emergency", "about us", "policy", "feedback", "cookies"]
 
-def scrape_rss(source: dict) -> list[dict]:
-    """RSS/Atom feed scraper."""
-    feed = feedparser.parse(source["url"])
-    items = []
-    for entry in feed.entries[:MAX_ITEMS]:
-        title = entry.get("title", "")
-        summary = entry.get("summary", entry.get("description", ""))
-        link = entry.get("link", source["url"])
-        # Strip HTML tags from summary
-        clean = BeautifulSoup(summary, "html.parser").get_text(separator=" ", strip=True)
-        items.append({"title": title, "raw_text": clean, "link": link})
+
+def fetch_body(source: dict) -> str | bytes | None:
+    """
+    Fetch a source's raw page or feed, recording the outcome on its circuit breaker.
+    Sources whose breaker is open are skipped without a request (returns None).
+    A response we reject (4xx, content type) returns None and is not counted as an outage
+    (the host answered), but a rejected half-open probe re-opens the breaker.
+    """
+    if not source_health.allow(source["id"]):
+        log.info(f"  Breaker open — skipping {source['name']}")
+        return None
+
+    started = time.monotonic()
+    try:
+        if source["scrape_method"] == "rss":
+            body = fetch_rss(source)
+        else:
+            body = fetch_html(source)
+    except FetchError:
+        source_health.record_failure(source["id"])
+        return None
+    if body is None:
+        source_health.record_rejected(source["id"])
+        return None
+
+    source_health.record_success(source["id"], (time.monotonic() - started) * 1000)
+    return body
+
+
+def finish_items(source: dict, parsed) -> list[dict]:
+    """Wait for a parse (see parsers.submit). PDF links are followed later, for new items only (new_records)."""
+    try:
+        items = parsed.result()
+    except parsers.ParseError as e:
+        log.error(f"Parse failed for {source['url']}: {e}")  # the host answered: not a breaker failure
+        return []
     return items
 
 
-# ── Main ───────────────────────────────────────────────────────────────
+def fetch_source(source: dict) -> list[dict]:
+    """Fetch one source and wait for its parsed items."""
+    body = fetch_body(source)
+    if body is None:
+        return []
+    return finish_items(source, parsers.submit(source, body))
 
-def run() -> list[dict]:
-    sources    = load_sources()
-    hash_cache = load_hash_cache()
-    results    = []
-    new_hashes = dict(hash_cache)
-    today      = datetime.date.today().isoformat()
 
-    log.info(f"Scraper started — {len(sources)} active sources")
+def build_record(source: dict, item: dict, today: str, hash_cache: dict, rank: int = 0) -> tuple[str, dict] | None:
+    """Turn a scraped item into a pipeline record, or None if it is junk or unchanged."""
+    combined = (item["title"] + item["raw_text"]).strip()
+    if len(combined) < 50:
+        return None  # Too short, skip
+
+    # Filter out junk/footer items
+    if any(k in item["title"].lower() for k in JUNK_KEYWORDS):
+        return None
+
+    content_hash = hash_content(combined)
+    cache_key = f"{source['id']}:{slugify(item['title'])}"
+
+    current = snapshots.segments(item)
+    if hash_cache.get(cache_key) == content_hash:
+        log.info(f"  Unchanged: {item['title'][:60]}")
+        snapshots.seed(cache_key, current)
+        return None
+
+    snapshots.stage(cache_key, current)
+    raw_text = item["raw_text"]
+    diff = snapshots.diff(cache_key, current)
+    if diff is not None:
+        if not diff["added"]:
+            # Nothing for the LLM, but settle the page so later runs don't re-diff the same change
+            log.info(f"  Only removals: {item['title'][:60]}")
+            snapshots.commit(cache_key)
+            settled[cache_key] = content_hash
+            return None
+        raw_text = "\n".join([item["title"]] + diff["added"])
+        log.info(f"  Changed {len(diff['added'])} of {len(current)} segments: {item['title'][:60]}")
+
+    record = {
+        "id": f"{source['id']}-{today}-{slugify(item['title'])}",
+        "source_id": source["id"],
+        "source_name": source["name"],
+        "source_url": item["link"],
+        "domain": source["domain"],
+        "country": source.get("country", ""),
+        "tier": source["tier"],
+        "badge": source["badge"],
+        "topics": source["topics"],
+        "title": item["title"],
+        "raw_text": raw_text[:MAX_RAW_CHARS],
+        "date_found": today,
+        "published": item.get("published", ""),
+        "rank": rank,  # position in the source's listing, 0 = top
+        "content_hash": content_hash
+    }
+    if diff is not None:
+        record["diff"] = diff
+    return cache_key, record
+
+
+def new_records(source: dict, raw_items: list[dict], hash_cache: dict) -> list[tuple[str, dict]]:
+    """
+    All new (cache_key, record) pairs from one source's scraped items, in listing order.
+    Linked PDFs are followed only for these, after change detection.
+    """
+    today = datetime.date.today().isoformat()
+    found = []
+    for item in raw_items:
+        built = build_record(source, item, today, hash_cache, rank=len(found))
+        if built:
+            found.append(built)
+    if source.get("follow_pdfs") and found:
+        import pdf_extract
+        records = [record for _, record in found]
+        pdf_extract.enrich(records, source, session(), HEADERS, REQUEST_TIMEOUT)
+        for record in records:
+            record["raw_text"] = record["raw_text"][:MAX_RAW_CHARS]
+    return found
+
+
+def collect_candidates(sources: list[dict], hash_cache: dict) -> dict[str, dict]:
+    """
+    Fetch every source and return all new records, keyed by hash-cache key.
+    Parsing is handed to the parser process pool so the next fetch starts immediately.
+    """
+    parsing = []
+    for source in sources:
+        log.info(f"Fetching: {source['name']} ({source['url']})")
+        body = fetch_body(source)
+        if body is None:
+            log.warning(f"No items found for {source['name']}")
+            continue
+        parsing.append((source, parsers.submit(source, body)))
+        time.sleep(CRAWL_DELAY)  # polite crawl delay between sources
+
+    candidates = {}
+    for source, parsed in parsing:
+        raw_items = finish_items(source, parsed)
+        if not raw_items:
+            log.warning(f"No items found for {source['name']}")
+            continue
+        for cache_key, record in new_records(source, raw_items, hash_cache):
+            candidates[cache_key] = record
+            log.info(f"  CANDIDATE: {record['title'][:60]}")
+    return candidates
+
+
+def accept(candidates: dict[str, dict], chosen: list[dict], new_hashes: dict):
+    """Mark chosen records as seen. Unchosen candidates keep their old hash and snapshot and compete next run."""
+    chosen_ids = {id(r) for r in chosen}
+    for cache_key, record in candidates.items():
+        if id(record) in chosen_ids:
+            new_hashes[cache_key] = record["content_hash"]
+            snapshots.commit(cache_key)
+
+
+def iter_new_items(sources: list[dict], hash_cache: dict, new_hashes: dict):
+    """
+    Yield new records one at a time as each source is fetched (streaming mode).
+    Quotas are applied as items arrive, since later sources cannot be seen yet;
+    ordering within each source still follows selector.priority. Items held back
+    by a quota get the budget left once every source is read (selector's fill pass).
+    """
+    counts: dict = {}
+    held: list[tuple[dict, dict]] = []
 
     for source in sources:
-        if len(results) >= MAX_ITEMS:
-            log.info("Max items reached, stopping.")
+        if counts.get("total", 0) >= selector.LLM_BUDGET:
+            log.info("LLM budget reached, stopping.")
             break
 
         log.info(f"Fetching: {source['name']} ({source['url']})")
-
-        if source["scrape_method"] == "rss":
-            raw_items = scrape_rss(source)
-        else:
-            raw_items = scrape_html(source)
+        raw_items = fetch_source(source)
 
         if not raw_items:
             log.warning(f"No items found for {source['name']}")
             continue
 
-        for item in raw_items:
-            if len(results) >= MAX_ITEMS:
-                break
+        found = dict(new_records(source, raw_items, hash_cache))
+        for record in sorted(found.values(), key=selector.priority):
+            if not selector.admit(record, counts):
+                held.append((found, record))
+                continue
+            accept(found, [record], new_hashes)
+            log.info(f"  NEW: {record['title'][:60]}")
+            yield record
 
-            combined = (item["title"] + item["raw_text"]).strip()
-            if len(combined) < 50:
-                continue  # Too short, skip
+        time.sleep(CRAWL_DELAY)  # polite crawl delay between sources
 
-            # Filter out junk/footer items
-            junk_keywords = ["contact", "representative", "emergency", "about us", "policy", "feedback", "cookies"]
-            if any(k in item["title"].lower() for k in junk_keywords):
-                continue
+    if selector.SELECT_PER_COUNTRY:
+        for found, record in sorted(held, key=lambda pair: selector.priority(pair[1])):
+            if selector.admit(record, counts, per_country=0):
+                accept(found, [record], new_hashes)
+                log.info(f"  NEW: {record['title'][:60]}")
+                yield record
 
-            content_hash = hash_content(combined)
-            cache_key = f"{source['id']}:{slugify(item['title'])}"
 
-            if hash_cache.get(cache_key) == content_hash:
-                log.info(f"  Unchanged: {item['title'][:60]}")
-                continue
+def save_outputs(results: list[dict], new_hashes: dict):
+    artifacts.write(artifacts.RAW_STREAM, "raw_content", results)
+    artifacts.to_json(artifacts.RAW_STREAM, RAW_OUTPUT)
+    save_state(new_hashes)
 
-            record = {
-                "id": f"{source['id']}-{today}-{slugify(item['title'])}",
-                "source_id": source["id"],
-                "source_name": source["name"],
-                "source_url": item["link"],
-                "domain": source["domain"],
-                "tier": source["tier"],
-                "badge": source["badge"],
-                "topics": source["topics"],
-                "title": item["title"],
-                "raw_text": item["raw_text"][:3000],  # cap at 3000 chars for LLM
-                "date_found": today,
-                "content_hash": content_hash
-            }
-
-            results.append(record)
-            new_hashes[cache_key] = content_hash
-            log.info(f"  NEW: {item['title'][:60]}")
-
-        time.sleep(1)  # polite crawl delay between sources
 
-    # Save outputs
-    with open(RAW_OUTPUT, "w") as f:
-        json.dump(results, f, indent=2, ensure_ascii=False)
+def save_state(new_hashes: dict):
     save_hash_cache(new_hashes)
+    snapshots.save()
+
+
+def run() -> list[dict]:
+    sources    = load_sources()
+    hash_cache = load_hash_cache()
+    new_hashes = dict(hash_cache)
+
+    log.info(f"Scraper started — {len(sources)} active sources")
 
-    log.info(f"Scraper done — {len(results)} new items saved to {RAW_OUTPUT}")
+    candidates = collect_candidates(sources, hash_cache)
+    results = selector.select(list(candidates.values()))
+    accept(candidates, results, new_hashes)
+    for record in results:
+        log.info(f"  NEW: {record['title'][:60]}")
+
+    # Save outputs
+    save_outputs(results, new_hashes)
+
+    log.info(f"Scraper done — {len(results)} new items saved to {artifacts.RAW_STREAM}")
+    return results
+
+
+# ── Sharded workers ────────────────────────────────────────────────────
+
+def crawl_shard(round_id: str, worker: str) -> int:
+    """
+    Lease sources one at a time until every source of the round is done, appending new
+    candidates to this worker's shard file. Waits on sources leased by other workers
+    so a dead worker's expired lease is picked up. Returns the number of sources crawled.
+    """
+    import leases
+
+    sources    = {s["id"]: s for s in load_sources()}
+    source_ids = list(sources)
+    hash_cache = load_hash_cache()
+    shard_file = SHARD_DIR / round_id / f"{worker}.jsonl"
+    shard_file.parent.mkdir(parents=True, exist_ok=True)
+    crawled = 0
+
+    log.info(f"Worker {worker} started — round {round_id}, {len(source_ids)} active sources")
+    while True:
+        source_id = leases.claim(source_ids, round_id, worker)
+        if source_id is None:
+            if not leases.pending(source_ids, round_id):
+                break
+            time.sleep(leases.LEASE_POLL_SEC)  # the rest are leased — wait in case one expires
+            continue
+
+        source = sources[source_id]
+        log.info(f"Fetching: {source['name']} ({source['url']})")
+        raw_items = fetch_source(source)
+        found = new_records(source, raw_items, hash_cache) if raw_items else []
+        with open(shard_file, "a", encoding="utf-8") as f:
+            for cache_key, record in found:
+                line = {"key": cache_key, "record": record, "segments": snapshots.staged(cache_key)}
+                f.write(json.dumps(line, ensure_ascii=False) + "\n")
+            # Removal-only pages: their snapshot is saved below, the merge saves their hash
+            for cache_key, content_hash in settled.items():
+                f.write(json.dumps({"key": cache_key, "record": None, "hash": content_hash}) + "\n")
+        settled.clear()
+        snapshots.save()  # baselines seeded for this source's unchanged items
+
+        if not leases.renew(source_id, worker):
+            log.warning(f"Lease on {source_id} lost while crawling — another worker will redo it")
+            continue
+        leases.complete(source_id, round_id, worker)
+        crawled += 1
+        log.info(f"  {source_id}: {len(found)} candidates → {shard_file.name}")
+        time.sleep(CRAWL_DELAY)  # polite crawl delay between sources
+
+    if crawled:
+        log.info(f"Worker {worker} finished — crawled {crawled} sources")
+    else:
+        log.warning(f"Worker {worker} found nothing left to claim in round {round_id} — "
+                    f"other workers had already crawled every source")
+    return crawled
+
+
+def merge_shards(round_id: str) -> list[dict]:
+    """Combine every worker's shard of the round, select what reaches the LLM, and save outputs."""
+    hash_cache = load_hash_cache()
+    new_hashes = dict(hash_cache)
+    candidates = {}
+    shard_files = sorted((SHARD_DIR / round_id).glob("*.jsonl"))
+    for shard_file in shard_files:
+        with open(shard_file, encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                if entry["record"] is None:
+                    settled[entry["key"]] = entry["hash"]
+                    continue
+                candidates[entry["key"]] = entry["record"]
+                if entry["segments"] is not None:
+                    snapshots.stage(entry["key"], entry["segments"])
+
+    results = selector.select(list(candidates.values()))
+    accept(candidates, results, new_hashes)
+    for record in results:
+        log.info(f"  NEW: {record['title'][:60]}")
+    save_outputs(results, new_hashes)
+    log.info(f"Merged {len(shard_files)} shards — {len(candidates)} candidates, {len(results)} new items saved")
+    return results
+
+
+def run_worker(round_id: str | None = None) -> list[dict] | None:
+    """
+    Worker mode: crawl a share of the sources, then — if this worker wins the
+    round's merge lease — merge all shards. Joins the open round unless round_id
+    is given. Returns the merged items, or None if another worker merges.
+    Raises RuntimeError if round_id names a round that was already merged.
+    """
+    import shutil
+    import leases
+
+    worker = leases.worker_id()
+    if round_id is None:
+        round_id = leases.current_round(worker)
+    elif leases.merged(round_id):
+        raise RuntimeError(f"Round {round_id} was already merged — nothing to crawl "
+                           f"(omit --round to start a new round)")
+    crawl_shard(round_id, worker)
+    if not leases.claim_merge(round_id, worker):
+        log.info(f"Round {round_id} is merged by another worker — {worker} done.")
+        return None
+    results = merge_shards(round_id)
+    leases.complete_merge(round_id, worker)
+    shutil.rmtree(SHARD_DIR / round_id, ignore_errors=True)  # kept until now so a failed merge can be redone
     return results
 
 
 if __name__ == "__main__":
+    setup_logging()
     run()
@@ -0,0 +1,85 @@
+"""
+selector.py — SmartNRI Item Selection
+Decides which new items are worth an LLM call, so sources.json order
+no longer decides what users see.
+
+Rules:
+- Candidates from every source compete on priority: badge (RED first), tier, rank within
+  their source (so every source's top item beats any source's second), then recency
+- The badge is the source's static badge from sources.json, not a per-item urgency (the LLM
+  only judges that after selection); with no RED/ORANGE source configured it just puts
+  GREEN sources ahead of BLUE ones, and tier/rank/recency decide the rest
+- At most SELECT_PER_SOURCE items per source and SELECT_PER_COUNTRY per country (0 = no cap)
+- Budget the country caps leave unused is filled by priority in a second pass that still
+  respects SELECT_PER_SOURCE — a single-country run fills LLM_BUDGET, a single source never does
+- Items not selected keep their old hash, so they compete again next run
+"""
+
+import os
+import logging
+import datetime
+
+import config  # noqa: F401 — loads .env before the getenv() calls below
+
+log = logging.getLogger("selector")
+
+LLM_BUDGET         = int(os.getenv("LLM_BUDGET", "5"))
+SELECT_PER_SOURCE  = int(os.getenv("SELECT_PER_SOURCE", "2"))
+SELECT_PER_COUNTRY = int(os.getenv("SELECT_PER_COUNTRY", "3"))
+
+BADGE_RANK = {"RED": 0, "ORANGE": 1, "GREEN": 2, "BLUE": 3}
+
+
+def _published_ts(record: dict) -> float:
+    try:
+        return datetime.datetime.fromisoformat(record.get("published") or "").timestamp()
+    except ValueError:
+        return 0.0
+
+
+def priority(record: dict) -> tuple:
+    """Sort key — lower sorts first. The badge is the source's, so it orders sources, not items."""
+    return (
+        BADGE_RANK.get(record["badge"].upper(), len(BADGE_RANK)),
+        record["tier"],
+        record.get("rank", 0),
+        -_published_ts(record),  # newest first
+        record["source_id"],
+    )
+
+
+def admit(record: dict, counts: dict, budget: int = LLM_BUDGET, per_country: int | None = None) -> bool:
+    """
+    Online quota check for streaming callers that cannot see every candidate up front.
+    counts is updated in place when the record is admitted. per_country defaults to
+    SELECT_PER_COUNTRY; the fill pass passes 0 to lift the country cap.
+    """
+    per_country = SELECT_PER_COUNTRY if per_country is None else per_country
+    source_key  = ("source", record["source_id"])
+    country_key = ("country", record.get("country", ""))
+    if counts.get("total", 0) >= budget:
+        return False
+    if SELECT_PER_SOURCE and counts.get(source_key, 0) >= SELECT_PER_SOURCE:
+        return False
+    if per_country and counts.get(country_key, 0) >= per_country:
+        return False
+    counts["total"] = counts.get("total", 0) + 1
+    counts[source_key] = counts.get(source_key, 0) + 1
+    counts[country_key] = counts.get(country_key, 0) + 1
+    return True
+
+
+def select(candidates: list[dict], budget: int = LLM_BUDGET) -> list[dict]:
+    """Pick up to `budget` candidates by priority within per-source/per-country quotas."""
+    ranked = sorted(candidates, key=priority)
+    counts: dict = {}
+    chosen = [r for r in ranked if admit(r, counts, budget)]
+
+    if len(chosen) < budget and SELECT_PER_COUNTRY:
+        picked = {id(r) for r in chosen}
+        chosen += [r for r in ranked if id(r) not in picked and admit(r, counts, budget, per_country=0)]
+        chosen.sort(key=priority)
+
+    log.info(f"Selected {len(chosen)} of {len(candidates)} candidates "
+             f"from {len({r['source_id'] for r in candidates})} sources (budget {budget})")
+    return chosen
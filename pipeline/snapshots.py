@@ -0,0 +1,132 @@
+"""
+snapshots.py — SmartNRI Page Snapshots + Diffing
+Remembers what each source's items looked like when they were last summarised,
+so a changed item sends only its new lines to the LLM instead of the whole block.
+
+Rules:
+- One gzip-compressed snapshot per source: data/snapshots/<source_id>.json.gz
+- An item is a list of text segments (the page's text nodes, or sentences for feeds);
+  segments that merely moved are not treated as changes
+- A changed item is diffed segment by segment against its snapshot; only added or
+  rewritten segments become summariser input, and the diff is kept on the record
+- Snapshots only advance when the item is accepted (selector.py), like the hash cache
+- No snapshot yet, or more than SNAPSHOT_FULL_RATIO of the item changed → whole item is sent
+- SNAPSHOT_DIFF=0 turns diffing off (snapshots are still kept)
+"""
+
+import os
+import re
+import gzip
+import json
+import logging
+
+from config import DATA_DIR
+
+SNAPSHOT_DIR = DATA_DIR / "snapshots"
+
+log = logging.getLogger("snapshots")
+
+SNAPSHOT_DIFF       = os.getenv("SNAPSHOT_DIFF", "1") == "1"
+SNAPSHOT_FULL_RATIO = float(os.getenv("SNAPSHOT_FULL_RATIO", "0.8"))
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+
+_snapshots: dict[str, dict[str, list[str]]] = {}  # source_id → {cache_key: segments}
+_pending: dict[str, list[str]] = {}               # cache_key → segments, until accepted
+_dirty: set[str] = set()
+
+
+def _source_id(cache_key: str) -> str:
+    return cache_key.split(":", 1)[0]
+
+
+def _path(source_id: str):
+    return SNAPSHOT_DIR / f"{source_id}.json.gz"
+
+
+def load(source_id: str) -> dict[str, list[str]]:
+    if source_id not in _snapshots:
+        path = _path(source_id)
+        _snapshots[source_id] = {}
+        if path.exists():
+            try:
+                with gzip.open(path, "rt", encoding="utf-8") as f:
+                    _snapshots[source_id] = json.load(f)
+            except (OSError, ValueError) as e:
+                log.warning(f"Snapshot for {source_id} unreadable, starting fresh: {e}")
+    return _snapshots[source_id]
+
+
+def save():
+    """Write every snapshot that changed since the last save."""
+    SNAPSHOT_DIR.mkdir(exist_ok=True)
+    for source_id in sorted(_dirty):
+        path = _path(source_id)
+        tmp = path.with_suffix(".tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(load(source_id), f, ensure_ascii=False, separators=(",", ":"))
+        tmp.replace(path)
+    _dirty.clear()
+
+
+def segments(item: dict) -> list[str]:
+    """An item's text as normalised segments: parser-provided text nodes, else sentences."""
+    parts = item.get("segments") or _SENTENCE_END.split(item["raw_text"])
+    return [" ".join(p.split()) for p in parts if p and p.strip()]
+
+
+def seed(cache_key: str, current: list[str]):
+    """Record a baseline for an unchanged item that has no snapshot yet."""
+    snapshot = load(_source_id(cache_key))
+    if cache_key not in snapshot:
+        snapshot[cache_key] = current
+        _dirty.add(_source_id(cache_key))
+
+
+def stage(cache_key: str, current: list[str]):
+    """Hold a changed item's segments until selector.py decides whether it is processed."""
+    _pending[cache_key] = current
+
+
+def staged(cache_key: str) -> list[str] | None:
+    """A changed item's staged segments — sharded workers hand these to the merging worker."""
+    return _pending.get(cache_key)
+
+
+def commit(cache_key: str):
+    """The item was accepted — its staged segments become the new snapshot."""
+    current = _pending.pop(cache_key, None)
+    if current is not None:
+        load(_source_id(cache_key))[cache_key] = current
+        _dirty.add(_source_id(cache_key))
+
+
+def diff(cache_key: str, current: list[str]) -> dict | None:
+    """
+    Segment diff against the last accepted snapshot:
+    {"added": [...], "removed": [...], "kept": n}.
+    None when the whole item should be summarised (no snapshot, mostly rewritten, diffing off).
+    """
+    previous = load(_source_id(cache_key)).get(cache_key)
+    if not SNAPSHOT_DIFF or not previous:
+        return None
+
+    from difflib import SequenceMatcher
+
+    added, removed, kept = [], [], 0
+    for op, i1, i2, j1, j2 in SequenceMatcher(None, previous, current, autojunk=False).get_opcodes():
+        if op == "equal":
+            kept += i2 - i1
+            continue
+        removed.extend(previous[i1:i2])
+        added.extend(current[j1:j2])
+    # A segment that only moved is not news
+    before, after = set(previous), set(current)
+    added = [s for s in added if s not in before]
+    removed = [s for s in removed if s not in after]
+
+    changed_chars = sum(len(s) for s in added)
+    total_chars = sum(len(s) for s in current) or 1
+    if changed_chars / total_chars > SNAPSHOT_FULL_RATIO:
+        return None
+    return {"added": added, "removed": removed, "kept": kept}
@@ -0,0 +1,161 @@
+"""
+source_health.py — SmartNRI Source Health Scoreboard + Circuit Breaker
+Remembers how every source has behaved across runs so a flaky host
+stops costing retries on every run.
+
+Rules:
+- Per source: consecutive failures, last success/failure, latency EWMA, breaker state
+- Breaker opens after BREAKER_FAILURES consecutive failures
+- Open sources are skipped without a request until BREAKER_COOLDOWN_MIN has passed
+- After the cooldown one half-open probe is allowed (other callers stay blocked while it is in
+  flight): success closes, failure re-opens
+- A host that answers with something we reject (4xx, wrong content type) is not down:
+  record_rejected() leaves the failure count alone, but a rejected probe re-opens the breaker
+  rather than letting traffic through unproven. Parse errors come after a successful fetch
+  and are not counted either.
+- Persisted to data/source_health.json; saves merge under a file lock so sharded
+  workers (leases.py) only overwrite the sources they touched
+"""
+
+import os
+import json
+import time
+import logging
+
+from config import DATA_DIR
+
+HEALTH_FILE = DATA_DIR / "source_health.json"
+
+log = logging.getLogger("source_health")
+
+BREAKER_FAILURES     = int(os.getenv("BREAKER_FAILURES", "3"))
+BREAKER_COOLDOWN_MIN = float(os.getenv("BREAKER_COOLDOWN_MIN", "60"))
+LATENCY_ALPHA        = 0.3  # EWMA weight of the newest sample
+
+CLOSED    = "closed"
+OPEN      = "open"
+HALF_OPEN = "half_open"
+
+_health: dict | None = None
+_touched: set[str] = set()
+
+
+def load_health() -> dict:
+    global _health
+    if _health is None:
+        _health = {}
+        if HEALTH_FILE.exists():
+            with open(HEALTH_FILE) as f:
+                _health = json.load(f)
+    return _health
+
+
+def save_health():
+    import fcntl
+
+    health = load_health()
+    with open(HEALTH_FILE.with_suffix(".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        on_disk = {}
+        if HEALTH_FILE.exists():
+            with open(HEALTH_FILE) as f:
+                on_disk = json.load(f)
+        # Keep other workers' entries, overwrite only the sources this process updated
+        on_disk.update({source_id: health[source_id] for source_id in _touched})
+        health.update({k: v for k, v in on_disk.items() if k not in _touched})
+        tmp = HEALTH_FILE.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(on_disk, f, indent=2)
+        tmp.replace(HEALTH_FILE)
+
+
+def _entry(source_id: str) -> dict:
+    return load_health().setdefault(source_id, {
+        "state": CLOSED,
+        "consecutive_failures": 0,
+        "last_success": None,
+        "last_failure": None,
+        "down_since": None,
+        "opened_at": None,
+        "probe_at": None,
+        "latency_ewma_ms": None,
+    })
+
+
+def allow(source_id: str) -> bool:
+    """True if the breaker lets a request through to this source right now."""
+    entry = _entry(source_id)
+    if entry["state"] == CLOSED:
+        return True
+    now = time.time()
+    if entry["state"] == HALF_OPEN:
+        # A probe is in flight; allow another only if that one never reported back
+        if now - (entry.get("probe_at") or 0) < BREAKER_COOLDOWN_MIN * 60:
+            return False
+    elif now - entry["opened_at"] < BREAKER_COOLDOWN_MIN * 60:
+        return False
+    entry["state"] = HALF_OPEN
+    entry["probe_at"] = now
+    log.info(f"Breaker half-open for {source_id} — sending probe")
+    return True
+
+
+def record_success(source_id: str, latency_ms: float):
+    entry = _entry(source_id)
+    if entry["state"] != CLOSED:
+        log.info(f"Breaker closed for {source_id}")
+    prev = entry["latency_ewma_ms"]
+    entry["latency_ewma_ms"] = round(
+        latency_ms if prev is None else LATENCY_ALPHA * latency_ms + (1 - LATENCY_ALPHA) * prev, 1
+    )
+    entry["state"] = CLOSED
+    entry["consecutive_failures"] = 0
+    entry["last_success"] = time.time()
+    entry["down_since"] = None
+    entry["opened_at"] = None
+    entry["probe_at"] = None
+    _touched.add(source_id)
+    save_health()
+
+
+def record_rejected(source_id: str):
+    """The host answered but we rejected the response — not an outage, but not a successful probe either."""
+    entry = _entry(source_id)
+    if entry["state"] != HALF_OPEN:
+        return
+    log.info(f"Breaker re-opened for {source_id} — probe response was rejected")
+    entry["state"] = OPEN
+    entry["opened_at"] = time.time()
+    entry["probe_at"] = None
+    _touched.add(source_id)
+    save_health()
+
+
+def record_failure(source_id: str):
+    entry = _entry(source_id)
+    entry["consecutive_failures"] += 1
+    entry["last_failure"] = time.time()
+    if entry["down_since"] is None:
+        entry["down_since"] = entry["last_failure"]
+    if entry["state"] == HALF_OPEN or entry["consecutive_failures"] >= BREAKER_FAILURES:
+        if entry["state"] != OPEN:
+            log.warning(f"Breaker OPEN for {source_id} after "
+                        f"{entry['consecutive_failures']} consecutive failures")
+        entry["state"] = OPEN
+        entry["opened_at"] = time.time()
+        entry["probe_at"] = None
+    _touched.add(source_id)
+    save_health()
+
+
+def down_sources(hours: float) -> list[tuple[str, float]]:
+    """Sources failing for longer than `hours`, as (source_id, hours_down)."""
+    now = time.time()
+    down = []
+    for source_id, entry in load_health().items():
+        if not entry["down_since"]:
+            continue
+        hours_down = (now - entry["down_since"]) / 3600
+        if hours_down > hours:
+            down.append((source_id, hours_down))
+    return down
@@ -0,0 +1,261 @@
+"""
+static_pages.py — SmartNRI Static Archive Pages
+Gives every update a permanent page, lists them per source domain and per country,
+and keeps sitemap.xml current — so updates stay findable after they leave index.html.
+Outputs: frontend/updates/<id>.html, frontend/domain/<domain>.html, frontend/country/<country>.html,
+         frontend/sitemap.xml (+ sitemap-<n>.xml chunks)
+
+Rules:
+- Incremental: data/site.db records each update's content digest; unchanged updates are never re-rendered
+- Index pages are fixed-size chunks (SITE_PAGE_SIZE) in publish order, so a new update only
+  re-renders the last chunk of its domain and country listing — never the whole archive
+- Sitemap is a sitemap index over SITEMAP_CHUNK-URL files; only the chunk holding new URLs is rewritten
+- Build time scales with new updates per run, not with archive size
+"""
+
+import os
+import json
+import html
+import sqlite3
+import hashlib
+import logging
+import datetime
+
+from config import DATA_DIR, FRONTEND_DIR, setup_logging
+import artifacts
+
+SITE_DB     = DATA_DIR / "site.db"
+SITEMAP     = FRONTEND_DIR / "sitemap.xml"
+
+log = logging.getLogger("static_pages")
+
+SITE_URL       = os.getenv("SITE_URL", "https://smartnri.com").rstrip("/")
+SITE_PAGE_SIZE = int(os.getenv("SITE_PAGE_SIZE", "50"))
+SITEMAP_CHUNK  = 10_000
+LISTINGS       = ("domain", "country")
+
+PAGE_FIELDS = ("title", "so_what", "bullets", "badge", "date", "source_name", "source_url", "domain", "country")
+
+STYLE = (
+    "body{font-family:system-ui,sans-serif;max-width:760px;margin:2rem auto;padding:0 1rem;"
+    "line-height:1.6;color:#1a1a2e}a{color:#0b6e4f}.badge{font-size:.8rem;font-weight:600;"
+    "text-transform:uppercase}.meta{color:#666;font-size:.9rem}li{margin:.3rem 0}"
+    "nav{margin:1.5rem 0;font-size:.9rem}"
+)
+
+
+# ── Manifest ───────────────────────────────────────────────────────────
+
+def _db() -> sqlite3.Connection:
+    conn = sqlite3.connect(SITE_DB)
+    conn.row_factory = sqlite3.Row
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS pages (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            id TEXT NOT NULL UNIQUE,
+            digest TEXT NOT NULL,
+            title TEXT NOT NULL,
+            so_what TEXT NOT NULL,
+            badge TEXT NOT NULL,
+            date TEXT NOT NULL,
+            domain TEXT NOT NULL,
+            country TEXT NOT NULL,
+            pos_domain INTEGER NOT NULL,
+            pos_country INTEGER NOT NULL,
+            updated TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS pages_domain  ON pages(domain, pos_domain);
+        CREATE INDEX IF NOT EXISTS pages_country ON pages(country, pos_country);
+    """)
+    return conn
+
+
+def page_digest(item: dict) -> str:
+    payload = json.dumps({k: item.get(k) for k in PAGE_FIELDS}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def slug(value: str) -> str:
+    return "".join(c if c.isalnum() or c in ".-" else "-" for c in value.lower()).strip("-") or "other"
+
+
+def update_path(item_id: str) -> str:
+    return f"updates/{slug(item_id)}.html"
+
+
+def listing_path(kind: str, key: str, chunk: int | None = None) -> str:
+    suffix = "" if chunk is None else f"-{chunk}"
+    return f"{kind}/{slug(key)}{suffix}.html"
+
+
+# ── Rendering ──────────────────────────────────────────────────────────
+
+def _page(title: str, description: str, path: str, body: str) -> str:
+    return (
+        f"<!DOCTYPE html>\n<html lang=\"en\"><head><meta charset=\"utf-8\">"
+        f"<meta name=\"viewport\" content=\"width=device-width, initial-scale=1\">"
+        f"<title>{html.escape(title)} &#8212; SmartNRI</title>"
+        f"<meta name=\"description\" content=\"{html.escape(description)}\">"
+        f"<link rel=\"canonical\" href=\"{SITE_URL}/{path}\">"
+        f"<style>{STYLE}</style></head>\n<body>"
+        f"<nav><a href=\"/\">SmartNRI</a></nav>\n{body}\n</body></html>\n"
+    )
+
+
+def render_update(item: dict) -> str:
+    country = item.get("country") or "other"
+    bullets = "".join(f"<li>{html.escape(b)}</li>" for b in item.get("bullets", []))
+    body = (
+        f"<article><p class=\"badge\">{html.escape(item['badge'])}</p>"
+        f"<h1>{html.escape(item['title'])}</h1>"
+        f"<p class=\"meta\">{html.escape(item['date'])} &middot; "
+        f"<a href=\"/{listing_path('domain', item['domain'])}\">{html.escape(item['source_name'])}</a> &middot; "
+        f"<a href=\"/{listing_path('country', country)}\">{html.escape(country.title())}</a></p>"
+        f"<p><strong>{html.escape(item.get('so_what', ''))}</strong></p>"
+        f"<ul>{bullets}</ul>"
+        f"<p><a href=\"{html.escape(item['source_url'])}\" rel=\"noopener\">Read the official source &#8594;</a></p>"
+        f"</article>"
+    )
+    return _page(item["title"], item.get("so_what", ""), update_path(item["id"]), body)
+
+
+def render_listing(kind: str, key: str, chunk: int, rows: list, is_latest: bool) -> str:
+    heading = f"Updates from {key}" if kind == "domain" else f"Updates for NRIs — {key.title()}"
+    items = "".join(
+        f"<li><a href=\"/{update_path(r['id'])}\">{html.escape(r['title'])}</a> "
+        f"<span class=\"meta\">{html.escape(r['date'])}</span><br>{html.escape(r['so_what'])}</li>"
+        for r in reversed(rows)  # newest first
+    )
+    nav = []
+    if not is_latest:
+        nav.append(f"<a href=\"/{listing_path(kind, key)}\">Latest</a>")
+    if chunk > 0:
+        nav.append(f"<a href=\"/{listing_path(kind, key, chunk - 1)}\">Older updates &#8594;</a>")
+    path = listing_path(kind, key) if is_latest else listing_path(kind, key, chunk)
+    body = f"<h1>{html.escape(heading)}</h1><ul>{items}</ul><nav>{' &middot; '.join(nav)}</nav>"
+    return _page(heading, f"Verified government updates — {key}", path, body)
+
+
+def render_sitemap_chunk(rows: list) -> str:
+    urls = "".join(
+        f"<url><loc>{SITE_URL}/{update_path(r['id'])}</loc><lastmod>{r['updated']}</lastmod></url>"
+        for r in rows
+    )
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>\n')
+
+
+def render_listing_sitemap(heads: list[str], today: str) -> str:
+    urls = "".join(f"<url><loc>{SITE_URL}/{p}</loc><lastmod>{today}</lastmod></url>" for p in heads)
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>\n')
+
+
+def render_sitemap_index(chunks: int, today: str) -> str:
+    maps = "".join(
+        f"<sitemap><loc>{SITE_URL}/sitemap-{n}.xml</loc><lastmod>{today}</lastmod></sitemap>"
+        for n in range(chunks)
+    )
+    maps += f"<sitemap><loc>{SITE_URL}/sitemap-listings.xml</loc><lastmod>{today}</lastmod></sitemap>"
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{maps}</sitemapindex>\n')
+
+
+def _write(path: str, content: str):
+    target = FRONTEND_DIR / path
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_suffix(".tmp")
+    tmp.write_text(content, encoding="utf-8")
+    tmp.replace(target)
+
+
+# ── Build ──────────────────────────────────────────────────────────────
+
+def build(summaries: list[dict]) -> dict:
+    """Render pages for new or changed summaries and only the listings/sitemap chunks they touch."""
+    today = datetime.date.today().isoformat()
+    conn = _db()
+    dirty_listings: set[tuple[str, str, int]] = set()
+    dirty_sitemaps: set[int] = set()
+    new_listing = False
+    rendered = 0
+
+    try:
+        with conn:
+            for item in summaries:
+                digest = page_digest(item)
+                row = conn.execute("SELECT seq, digest, pos_domain, pos_country FROM pages WHERE id = ?",
+                                   (item["id"],)).fetchone()
+                if row and row["digest"] == digest and (FRONTEND_DIR / update_path(item["id"])).exists():
+                    continue
+
+                _write(update_path(item["id"]), render_update(item))
+                rendered += 1
+                fields = (digest, item["title"], item.get("so_what", ""), item["badge"], item["date"], today)
+                if row:
+                    # Listing membership is fixed at first publish; only the text shown there changes
+                    conn.execute("UPDATE pages SET digest = ?, title = ?, so_what = ?, badge = ?, date = ?, "
+                                 "updated = ? WHERE seq = ?", (*fields, row["seq"]))
+                    seq, positions = row["seq"], {"domain": row["pos_domain"], "country": row["pos_country"]}
+                    keys = conn.execute("SELECT domain, country FROM pages WHERE seq = ?", (seq,)).fetchone()
+                else:
+                    keys = {"domain": item["domain"], "country": item.get("country") or "other"}
+                    positions = {
+                        kind: conn.execute(f"SELECT COALESCE(MAX(pos_{kind}) + 1, 0) FROM pages WHERE {kind} = ?",
+                                           (keys[kind],)).fetchone()[0]
+                        for kind in LISTINGS
+                    }
+                    seq = conn.execute(
+                        "INSERT INTO pages (id, digest, title, so_what, badge, date, updated, "
+                        "domain, country, pos_domain, pos_country) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (item["id"], *fields, keys["domain"], keys["country"],
+                         positions["domain"], positions["country"]),
+                    ).lastrowid
+                    new_listing = new_listing or 0 in positions.values()
+                for kind in LISTINGS:
+                    dirty_listings.add((kind, keys[kind], positions[kind] // SITE_PAGE_SIZE))
+                dirty_sitemaps.add((seq - 1) // SITEMAP_CHUNK)
+
+        for kind, key, chunk in sorted(dirty_listings):
+            last = conn.execute(f"SELECT MAX(pos_{kind}) FROM pages WHERE {kind} = ?", (key,)).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT id, title, so_what, date FROM pages WHERE {kind} = ? AND pos_{kind} BETWEEN ? AND ? "
+                f"ORDER BY pos_{kind}", (key, chunk * SITE_PAGE_SIZE, (chunk + 1) * SITE_PAGE_SIZE - 1),
+            ).fetchall()
+            _write(listing_path(kind, key, chunk), render_listing(kind, key, chunk, rows, is_latest=False))
+            if chunk == last // SITE_PAGE_SIZE:
+                _write(listing_path(kind, key), render_listing(kind, key, chunk, rows, is_latest=True))
+
+        if dirty_sitemaps:
+            for chunk in sorted(dirty_sitemaps):
+                rows = conn.execute("SELECT id, updated FROM pages WHERE seq BETWEEN ? AND ? ORDER BY seq",
+                                    (chunk * SITEMAP_CHUNK + 1, (chunk + 1) * SITEMAP_CHUNK)).fetchall()
+                _write(f"sitemap-{chunk}.xml", render_sitemap_chunk(rows))
+            if new_listing or not (FRONTEND_DIR / "sitemap-listings.xml").exists():
+                # One URL per domain/country head — only rewritten when a new listing appears
+                heads = [listing_path(kind, r[0]) for kind in LISTINGS
+                         for r in conn.execute(f"SELECT DISTINCT {kind} FROM pages")]
+                _write("sitemap-listings.xml", render_listing_sitemap(heads, today))
+            max_seq = conn.execute("SELECT MAX(seq) FROM pages").fetchone()[0]
+            _write(SITEMAP.name, render_sitemap_index((max_seq - 1) // SITEMAP_CHUNK + 1, today))
+    finally:
+        conn.close()
+
+    stats = {"rendered": rendered, "listings": len(dirty_listings), "sitemaps": len(dirty_sitemaps)}
+    if rendered:
+        log.info(f"Static pages — {rendered} update pages, {stats['listings']} listing pages, "
+                 f"{stats['sitemaps']} sitemap chunks rendered")
+    return stats
+
+
+def run():
+    summaries_file = DATA_DIR / "summaries.json"
+    if not artifacts.exists(artifacts.SUMMARIES_STREAM, legacy=summaries_file):
+        log.warning("summaries.ndjson not found — no pages to build.")
+        return
+    build(artifacts.read(artifacts.SUMMARIES_STREAM, artifacts.Summary, legacy=summaries_file))
+
+
+if __name__ == "__main__":
+    setup_logging()
+    run()
@@ -0,0 +1,145 @@
+"""
+streaming.py — SmartNRI Streaming Pipeline
+Runs scraper → summarizer → publisher as concurrent stages joined by bounded queues,
+so LLM calls start while later sources are still being fetched.
+
+Rules:
+- Queues are bounded (STREAM_QUEUE_SIZE) — a slow LLM throttles the scraper, never the reverse
+- SUMMARY_WORKERS threads call the LLM in parallel
+- RED alerts are sent as soon as their summary completes
+- Raw items and summaries are appended to raw_content.ndjson / summaries.ndjson as they are produced
+  (artifacts.py), so other processes can follow them; raw items are not kept in memory
+- raw_content.json, content_hashes.json and summaries.json are still written for batch consumers
+- Any stage failure stops every stage cleanly and is re-raised to main.py
+"""
+
+import os
+import queue
+import logging
+import threading
+
+import config  # noqa: F401 — loads .env before the getenv() calls below
+
+log = logging.getLogger("streaming")
+
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "10"))
+SUMMARY_WORKERS   = int(os.getenv("SUMMARY_WORKERS", "3"))
+POLL_SECONDS      = 0.5
+
+_DONE = object()  # end-of-stream sentinel
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    """Blocking put that gives up once the pipeline is shutting down."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=POLL_SECONDS)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q: queue.Queue, stop: threading.Event):
+    """Blocking get that returns _DONE once the pipeline is shutting down."""
+    while not stop.is_set():
+        try:
+            return q.get(timeout=POLL_SECONDS)
+        except queue.Empty:
+            continue
+    return _DONE
+
+
+def run() -> tuple[int, list[dict]]:
+    """Run all stages concurrently. Returns (raw item count, summaries)."""
+    import artifacts
+    import scraper
+    import summarizer
+    import publisher
+
+    sources    = scraper.load_sources()
+    hash_cache = scraper.load_hash_cache()
+    new_hashes = dict(hash_cache)
+    workers    = max(1, SUMMARY_WORKERS)
+
+    raw_q     = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+    summary_q = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+    stop      = threading.Event()
+    errors: list[BaseException] = []
+    raw_out     = artifacts.Writer(artifacts.RAW_STREAM, "raw_content")
+    summary_out = artifacts.Writer(artifacts.SUMMARIES_STREAM, "summaries")
+
+    def fail(e: BaseException):
+        errors.append(e)
+        stop.set()
+
+    def produce():
+        try:
+            for record in scraper.iter_new_items(sources, hash_cache, new_hashes):
+                raw_out.write(record)
+                if not _put(raw_q, record, stop):
+                    return
+        except Exception as e:
+            log.error(f"Scraper stage failed: {e}")
+            fail(e)
+        finally:
+            for _ in range(workers):
+                _put(raw_q, _DONE, stop)
+
+    def summarise_worker():
+        try:
+            while True:
+                item = _get(raw_q, stop)
+                if item is _DONE:
+                    return
+                log.info(f"  Processing: {item['title'][:60]}")
+                result = summarizer.summarise(item)
+                if result and not _put(summary_q, result, stop):
+                    return
+        except Exception as e:
+            fail(e)
+        finally:
+            _put(summary_q, _DONE, stop)
+
+    log.info(f"Streaming run — {len(sources)} sources, {workers} summariser workers, "
+             f"queue size {STREAM_QUEUE_SIZE}")
+
+    threads = [threading.Thread(target=produce, name="stream-scraper", daemon=True)]
+    threads += [
+        threading.Thread(target=summarise_worker, name=f"stream-summariser-{i}", daemon=True)
+        for i in range(workers)
+    ]
+    for t in threads:
+        t.start()
+
+    # Publisher stage runs on the calling thread
+    summaries: list[dict] = []
+    finished = 0
+    while finished < workers:
+        summary = _get(summary_q, stop)
+        if summary is _DONE:
+            if stop.is_set():
+                break
+            finished += 1
+            continue
+        summaries.append(summary)
+        summary_out.write(summary)
+        if summary["badge"] == "RED":
+            publisher.send_telegram(publisher.format_telegram_alert(summary))
+
+    for t in threads:
+        t.join()
+
+    # Batch artifacts are written even on failure so the watchdog sees the same files
+    raw_out.close(error=bool(errors))
+    summary_out.close(error=bool(errors))
+    artifacts.to_json(artifacts.RAW_STREAM, scraper.RAW_OUTPUT)
+    artifacts.to_json(artifacts.SUMMARIES_STREAM, summarizer.SUMMARIES_OUT)
+    scraper.save_state(new_hashes)
+
+    if errors:
+        raise errors[0]
+
+    log.info(f"Streaming done — {raw_out.count} fetched, {len(summaries)} summarised")
+    publisher.publish(summaries, send_alerts=False)
+    return raw_out.count, summaries
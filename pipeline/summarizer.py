@@ -1,45 +1,37 @@
 """
 summarizer.py — SmartNRI LLM Processor
-Takes raw_content.json and produces badge-tagged, bullet-point summaries.
-Outputs: data/summaries.json
+Takes raw_content.ndjson and produces badge-tagged, bullet-point summaries.
+Outputs: data/summaries.ndjson (+ summaries.json for batch consumers)
 
 Rules:
 - Uses OpenAI gpt-4o-mini OR Gemini gemini-1.5-flash (configured via .env)
+- LLM_PROVIDER=stub gives a deterministic offline summary for benchmarks / replay runs
 - Temperature 0.1 (factual, not creative)
 - If LLM cannot summarise accurately → {"skip": true}
 - If API fails → raise exception (watchdog catches this)
+- Items are read and summaries written one at a time (artifacts.py);
+  `--follow` tails the scraper's stream and summarises items while it is still crawling
 """
 
 import os
+import sys
 import json
+import time
 import logging
-from pathlib import Path
-from dotenv import load_dotenv
 
-load_dotenv()
+from config import DATA_DIR, setup_logging
+import artifacts
 
-BASE_DIR     = Path(__file__).resolve().parent.parent
-DATA_DIR     = BASE_DIR / "data"
-LOG_DIR      = BASE_DIR / "logs"
 RAW_INPUT    = DATA_DIR / "raw_content.json"
 SUMMARIES_OUT = DATA_DIR / "summaries.json"
 
-LOG_DIR.mkdir(exist_ok=True)
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler(LOG_DIR / "pipeline.log"),
-        logging.StreamHandler()
-    ]
-)
 log = logging.getLogger("summarizer")
 
 # ── LLM config ────────────────────────────────────────────────────────
-LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai").lower()  # "openai" or "gemini"
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai").lower()  # "openai", "gemini" or "stub"
 OPENAI_KEY   = os.getenv("OPENAI_API_KEY", "")
 GEMINI_KEY   = os.getenv("GEMINI_API_KEY", "")
+STUB_LATENCY_MS = float(os.getenv("STUB_LLM_LATENCY_MS", "0"))
 
 SYSTEM_PROMPT = """You are a compliance guide for Indian expats (NRIs) living abroad.
 Your job is to summarise government updates into clear, actionable intelligence.
@@ -98,11 +90,27 @@ def call_gemini(raw_text: str, source_url: str) -> dict:
     return json.loads(text)
 
 
+def call_stub(raw_text: str, source_url: str) -> dict:
+    """Offline stand-in for benchmarks and replay runs — deterministic, no network."""
+    if STUB_LATENCY_MS:
+        time.sleep(STUB_LATENCY_MS / 1000)
+    sentences = [s.strip() for s in raw_text.split(".") if s.strip()] or [raw_text[:120]]
+    return {
+        "title": " ".join(sentences[0].split()[:12]),
+        "so_what": sentences[0][:160] + ".",
+        "bullets": [f"Review: {s[:160]}." for s in sentences[:3]],
+        "badge": "GREEN",
+        "skip": False,
+    }
+
+
 def summarise(item: dict) -> dict | None:
     """Call LLM and return structured summary or None if skipped."""
     try:
         if LLM_PROVIDER == "gemini":
             result = call_gemini(item["raw_text"], item["source_url"])
+        elif LLM_PROVIDER == "stub":
+            result = call_stub(item["raw_text"], item["source_url"])
         else:
             result = call_openai(item["raw_text"], item["source_url"])
 
@@ -117,6 +125,8 @@ def summarise(item: dict) -> dict | None:
             "source_name": item["source_name"],
             "source_url":  item["source_url"],
             "domain":      item["domain"],
+            "country":     item.get("country", ""),
+            "topics":      item.get("topics", []),
             "tier":        item["tier"],
             "date":        item["date_found"],
             "badge":       result.get("badge", item.get("badge", "green")).upper(),
@@ -131,35 +141,42 @@ def summarise(item: dict) -> dict | None:
         raise  # Let watchdog catch this
 
 
-def run() -> list[dict]:
-    if not RAW_INPUT.exists():
-        log.warning("raw_content.json not found — nothing to summarise.")
-        return []
+def save_summaries(summaries: list[dict]):
+    artifacts.write(artifacts.SUMMARIES_STREAM, "summaries", summaries)
+    artifacts.to_json(artifacts.SUMMARIES_STREAM, SUMMARIES_OUT)
 
-    with open(RAW_INPUT) as f:
-        raw_items = json.load(f)
-
-    if not raw_items:
-        log.info("No new items to summarise.")
-        with open(SUMMARIES_OUT, "w") as f:
-            json.dump([], f)
-        return []
 
-    log.info(f"Summarising {len(raw_items)} items via {LLM_PROVIDER.upper()}...")
-    summaries = []
+def run(follow: bool = False) -> int:
+    """Summarise every raw item as it is read. Returns the number of summaries written."""
+    if follow:
+        log.info(f"Following {artifacts.RAW_STREAM.name} via {LLM_PROVIDER.upper()}...")
+        raw_items = artifacts.follow(artifacts.RAW_STREAM, artifacts.RawItem)
+    elif artifacts.exists(artifacts.RAW_STREAM, legacy=RAW_INPUT):
+        log.info(f"Summarising via {LLM_PROVIDER.upper()}...")
+        raw_items = artifacts.read(artifacts.RAW_STREAM, artifacts.RawItem, legacy=RAW_INPUT)
+    else:
+        log.warning("raw_content.ndjson not found — nothing to summarise.")
+        return 0
 
-    for item in raw_items:
-        log.info(f"  Processing: {item['title'][:60]}")
-        result = summarise(item)
-        if result:
-            summaries.append(result)
-
-    with open(SUMMARIES_OUT, "w") as f:
-        json.dump(summaries, f, indent=2, ensure_ascii=False)
-
-    log.info(f"Summariser done — {len(summaries)} summaries saved.")
-    return summaries
+    seen = 0
+    try:
+        with artifacts.Writer(artifacts.SUMMARIES_STREAM, "summaries") as out:
+            for item in raw_items:
+                seen += 1
+                log.info(f"  Processing: {item['title'][:60]}")
+                result = summarise(item)
+                if result:
+                    out.write(result)
+    finally:
+        # Written even on failure so the watchdog sees the same files
+        artifacts.to_json(artifacts.SUMMARIES_STREAM, SUMMARIES_OUT)
+
+    if not seen:
+        log.info("No new items to summarise.")
+    log.info(f"Summariser done — {out.count} summaries saved.")
+    return out.count
 
 
 if __name__ == "__main__":
-    run()
+    setup_logging()
+    run(follow="--follow" in sys.argv)
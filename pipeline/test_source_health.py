@@ -0,0 +1,73 @@
+"""
+test_source_health.py — SmartNRI circuit breaker behaviour
+Run: python -m pytest pipeline/test_source_health.py
+"""
+
+import pytest
+
+import source_health as sh
+
+
+@pytest.fixture(autouse=True)
+def health_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(sh, "HEALTH_FILE", tmp_path / "source_health.json")
+    monkeypatch.setattr(sh, "_health", None)
+    monkeypatch.setattr(sh, "_touched", set())
+    monkeypatch.setattr(sh, "BREAKER_FAILURES", 2)
+
+
+def trip(source_id: str = "src"):
+    for _ in range(sh.BREAKER_FAILURES):
+        sh.record_failure(source_id)
+
+
+def cool_down(source_id: str = "src"):
+    sh._entry(source_id)["opened_at"] -= sh.BREAKER_COOLDOWN_MIN * 60 + 1
+
+
+def test_opens_after_consecutive_failures():
+    trip()
+    assert sh._entry("src")["state"] == sh.OPEN
+    assert not sh.allow("src")
+
+
+def test_rejected_response_is_not_an_outage():
+    sh.record_rejected("src")
+    sh.record_failure("src")
+    sh.record_rejected("src")
+    entry = sh._entry("src")
+    assert entry["state"] == sh.CLOSED
+    assert entry["consecutive_failures"] == 1
+
+
+def test_half_open_allows_a_single_probe():
+    trip()
+    cool_down()
+    assert sh.allow("src")
+    assert sh._entry("src")["state"] == sh.HALF_OPEN
+    assert not sh.allow("src")  # probe still in flight
+
+
+def test_rejected_probe_reopens_the_breaker():
+    trip()
+    cool_down()
+    assert sh.allow("src")
+    sh.record_rejected("src")
+    assert sh._entry("src")["state"] == sh.OPEN
+    assert not sh.allow("src")
+
+
+def test_failed_probe_reopens_and_successful_probe_closes():
+    trip()
+    cool_down()
+    assert sh.allow("src")
+    sh.record_failure("src")
+    assert sh._entry("src")["state"] == sh.OPEN
+
+    cool_down()
+    assert sh.allow("src")
+    sh.record_success("src", 120.0)
+    entry = sh._entry("src")
+    assert entry["state"] == sh.CLOSED
+    assert entry["consecutive_failures"] == 0
+    assert sh.allow("src")
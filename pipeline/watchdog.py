@@ -8,46 +8,47 @@ import os
 import json
 import logging
 import datetime
-import smtplib
-from email.mime.text import MIMEText
-from pathlib import Path
 
-import requests
-from dotenv import load_dotenv
+from config import DATA_DIR, LOG_DIR, FRONTEND_DIR, setup_logging, flush_logging
+import mailer
+import source_health
 
-load_dotenv()
-
-BASE_DIR      = Path(__file__).resolve().parent.parent
-DATA_DIR      = BASE_DIR / "data"
-LOG_DIR       = BASE_DIR / "logs"
 SUMMARIES_FILE = DATA_DIR / "summaries.json"
-INDEX_HTML    = BASE_DIR / "frontend" / "index.html"
+INDEX_HTML    = FRONTEND_DIR / "index.html"
 PIPELINE_LOG  = LOG_DIR / "pipeline.log"
 
-logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 log = logging.getLogger("watchdog")
 
 TELEGRAM_TOKEN   = os.getenv("TELEGRAM_BOT_TOKEN", "")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID", "")
-SMTP_HOST        = os.getenv("SMTP_HOST", "")
-SMTP_PORT        = int(os.getenv("SMTP_PORT", "587"))
-SMTP_USER        = os.getenv("SMTP_USER", "")
-SMTP_PASS        = os.getenv("SMTP_PASS", "")
 ALERT_EMAIL      = os.getenv("ALERT_EMAIL", "")
 
 MAX_INDEX_AGE_HOURS = 28
+SOURCE_DOWN_ALERT_HOURS = float(os.getenv("SOURCE_DOWN_ALERT_HOURS", "48"))
+MAIL_DRAIN_SEC = float(os.getenv("MAIL_DRAIN_SEC", "30"))  # spool retry budget per watchdog run
 
 
-def get_last_log_lines(n: int = 15) -> str:
+def get_last_log_lines(n: int = 15, block_size: int = 4096) -> str:
+    """Read backwards from the end of the log in blocks, so memory stays flat as the log grows."""
+    flush_logging()
     if not PIPELINE_LOG.exists():
         return "(no log file found)"
-    lines = PIPELINE_LOG.read_text(encoding="utf-8", errors="replace").splitlines()
+    with open(PIPELINE_LOG, "rb") as f:
+        pos = f.seek(0, os.SEEK_END)
+        data = b""
+        while pos > 0 and data.count(b"\n") <= n:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+    lines = data.decode("utf-8", errors="replace").splitlines()
     return "\n".join(lines[-n:])
 
 
 def send_telegram(message: str):
     if not TELEGRAM_TOKEN or not TELEGRAM_CHAT_ID:
         return
+    import requests
     try:
         requests.post(
             f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage",
@@ -59,18 +60,17 @@ def send_telegram(message: str):
 
 
 def send_email(subject: str, body: str):
-    if not all([SMTP_HOST, SMTP_USER, SMTP_PASS, ALERT_EMAIL]):
+    """Spooled and sent over a pooled session (mailer.py); a failed send is retried on the next watchdog run."""
+    if not (mailer.configured() and ALERT_EMAIL):
         return
     try:
-        msg = MIMEText(body)
-        msg["Subject"] = subject
-        msg["From"]    = SMTP_USER
-        msg["To"]      = ALERT_EMAIL
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as s:
-            s.starttls()
-            s.login(SMTP_USER, SMTP_PASS)
-            s.sendmail(SMTP_USER, ALERT_EMAIL, msg.as_string())
-        log.info("Watchdog email sent.")
+        status = mailer.send([ALERT_EMAIL], subject, body)
+        if status.get("sent"):
+            log.info("Watchdog email sent.")
+        elif status.get("failed"):
+            log.error("Watchdog email rejected by the SMTP server — see the mail spool.")
+        else:
+            log.warning("Watchdog email not sent yet — left in the mail spool for retry.")
     except Exception as e:
         log.error(f"Watchdog email failed: {e}")
 
@@ -94,6 +94,13 @@ def run(pipeline_failed: bool = False) -> bool:
     if pipeline_failed:
         issues.append("Pipeline exited with an error")
 
+    # Retry alerts and reports an earlier run could not send, without stalling behind a digest backlog
+    if mailer.configured():
+        try:
+            mailer.deliver(budget_sec=MAIL_DRAIN_SEC)
+        except Exception as e:
+            log.error(f"Mail spool delivery failed: {e}")
+
     # Check summaries.json exists and is non-empty
     if not SUMMARIES_FILE.exists():
         issues.append("summaries.json does not exist")
@@ -112,6 +119,10 @@ def run(pipeline_failed: bool = False) -> bool:
     else:
         issues.append("index.html does not exist")
 
+    # Check no source has been failing for too long
+    for source_id, hours_down in source_health.down_sources(SOURCE_DOWN_ALERT_HOURS):
+        issues.append(f"Source {source_id} down for {hours_down:.0f} hours (max {SOURCE_DOWN_ALERT_HOURS:.0f}h)")
+
     if issues:
         for issue in issues:
             alert(issue)
@@ -122,4 +133,5 @@ def run(pipeline_failed: bool = False) -> bool:
 
 
 if __name__ == "__main__":
+    setup_logging()
     run()